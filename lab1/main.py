@@ -1,12 +1,40 @@
 import pygame
 import random
 import math
+import heapq
+import os
+import json
+import pickle
+import hashlib
+import argparse
+import multiprocessing
+import weakref
+import contextlib
+import csv
+import time
+from collections import Counter, deque
+
+try:
+    import numpy as np
+except ImportError:  # NumPy потрібен лише для пакетного оновлення привидів (GhostSwarm)
+    np = None
 
 # --- Константи ---
 SCREEN_WIDTH = 606
 SCREEN_HEIGHT = 606
 PACMAN_SPEED = 20
 GHOST_BASE_SPEED = 18
+SIGHT_CACHE_LIMIT = 200000  # Максимальна кількість збережених результатів перевірки видимості
+NAV_STEP = 30  # Крок решітки навігаційного графа за замовчуванням (рівень задає свій у "navigation")
+NAV_ORIGIN = 33  # Центр першого коридору за замовчуванням
+NAV_ALL_PAIRS_LIMIT = 2000  # До цієї кількості вузлів таблиця шляхів будується для всіх пар
+SPATIAL_CELL_SIZE = 30  # Розмір клітинки просторового індексу (крок решітки точок)
+BOT_DANGER_DISTANCE = 90  # Відстань до привида, з якої бот у симуляції починає тікати
+BOT_RANDOM_MOVE = 0.1  # Імовірність випадкового ходу бота
+
+# Файл рівня за замовчуванням і версія формату скомпільованого рівня
+DEFAULT_LEVEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels", "room_one.json")
+LEVEL_FORMAT_VERSION = "3"
 
 # --- Кольори ---
 BLACK = (0, 0, 0)
@@ -17,17 +45,158 @@ RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 ORANGE = (255, 165, 0)
 
-# Глобальна змінна для рівня складності
-DIFFICULTY_LEVEL = 1
+# Клавіші керування Пакменом та відповідні швидкості
+PACMAN_DIRECTIONS = {
+    pygame.K_LEFT: (-PACMAN_SPEED, 0),
+    pygame.K_RIGHT: (PACMAN_SPEED, 0),
+    pygame.K_UP: (0, -PACMAN_SPEED),
+    pygame.K_DOWN: (0, PACMAN_SPEED),
+}
 
 # Завантаження іконки
 try:
     PacmanIcon = pygame.image.load('images/pacman.png')
     pygame.display.set_icon(PacmanIcon)
-except pygame.error:
+except (pygame.error, FileNotFoundError):
     print("Не вдалося завантажити іконку 'images/pacman.png', використовується стандартна")
 
 
+# --- Завантаження зображень ---
+_image_cache = {}
+
+
+def load_image(filename):
+    """
+    Завантажує зображення спрайта. Файл читається з диска лише один раз;
+    конвертація виконується, тільки якщо відкрито вікно, тож функція
+    працює і в симуляції без відображення.
+    """
+    image = _image_cache.get(filename)
+    if image is None:
+        try:
+            image = pygame.image.load(filename)
+        except (pygame.error, FileNotFoundError):
+            image = pygame.Surface([20, 20])
+            image.fill(YELLOW)
+            print(f"Попередження: Не знайдено файл {filename}. Використовується жовтий квадрат.")
+        _image_cache[filename] = image
+    if pygame.display.get_surface() is not None:
+        return image.convert_alpha()
+    return image
+
+
+# --- Профілювання ---
+
+class FrameProfiler:
+    """
+    Збирає час кожної фази кадру (події, Пакмен, привиди, зіткнення,
+    малювання), лічильники гарячих викликів (перевірки стін, видимості)
+    та гістограму тривалості кадрів. Вмикається функцією enable_profiling.
+    """
+
+    def __init__(self, bucket_ms=1):
+        self.bucket_ms = bucket_ms
+        self.frames = []
+        self.histogram = Counter()
+        self.phases = {}
+        self.counters = Counter()
+        self._frame_start = None
+
+    def start_frame(self):
+        self.phases = {}
+        self.counters = Counter()
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self._frame_start is None: return
+        total = (time.perf_counter() - self._frame_start) * 1000
+        self.frames.append({"frame": len(self.frames), "total_ms": total,
+                            **{f"{name}_ms": ms for name, ms in self.phases.items()},
+                            **self.counters})
+        self.histogram[int(total // self.bucket_ms) * self.bucket_ms] += 1
+        self._frame_start = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + (time.perf_counter() - start) * 1000
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def summary(self):
+        """Середні значення кожної колонки та перцентилі тривалості кадру"""
+        if not self.frames:
+            return {}
+        columns = sorted({key for frame in self.frames for key in frame if key != "frame"})
+        totals = sorted(frame["total_ms"] for frame in self.frames)
+        summary = {f"avg_{key}": sum(frame.get(key, 0) for frame in self.frames) / len(self.frames)
+                   for key in columns}
+        summary["frames"] = len(self.frames)
+        summary["p50_total_ms"] = totals[len(totals) // 2]
+        summary["p95_total_ms"] = totals[min(len(totals) - 1, int(len(totals) * 0.95))]
+        return summary
+
+    def dump(self, filename):
+        """Зберігає дані кадрів у CSV або (для інших розширень) разом зі зведенням у JSON"""
+        if filename.endswith(".csv"):
+            columns = ["frame", "total_ms"] + sorted({key for frame in self.frames for key in frame}
+                                                     - {"frame", "total_ms"})
+            with open(filename, "w", newline="") as f:
+                writer = csv.DictWriter(f, columns, restval=0)
+                writer.writeheader()
+                writer.writerows(self.frames)
+        else:
+            with open(filename, "w") as f:
+                json.dump({"summary": self.summary(), "histogram_ms": dict(sorted(self.histogram.items())),
+                           "frames": self.frames}, f, indent=2)
+
+
+class ProfilerOverlay(pygame.sprite.DirtySprite):
+    """Напівпрозора панель з часом фаз останнього кадру (вмикається клавішею F3)"""
+
+    def __init__(self, font, anchor=(10, 40)):
+        super().__init__()
+        self.font = font
+        self.image = pygame.Surface([0, 0])
+        self.rect = self.image.get_rect(topleft=anchor)
+        self.visible = 0
+
+    def show_frame(self, frame):
+        if not self.visible or not frame: return
+        lines = [f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}"
+                 for key, value in frame.items() if key != "frame"]
+        rendered = [self.font.render(line, True, GREEN) for line in lines]
+        self.image = pygame.Surface([max(line.get_width() for line in rendered) + 8,
+                                     sum(line.get_height() for line in rendered) + 8], pygame.SRCALPHA)
+        self.image.fill((0, 0, 0, 180))
+        y = 4
+        for line in rendered:
+            self.image.blit(line, (4, y))
+            y += line.get_height()
+        self.rect = self.image.get_rect(topleft=self.rect.topleft)
+        self.dirty = 1
+
+
+profiler = None  # Активний FrameProfiler або None, якщо профілювання вимкнене
+_no_phase = contextlib.nullcontext()
+
+
+def enable_profiling():
+    """Вмикає збір статистики кадрів і повертає профайлер"""
+    global profiler
+    profiler = FrameProfiler()
+    return profiler
+
+
+def profile_phase(name):
+    """Контекст для заміру фази кадру; без активного профайлера нічого не робить"""
+    return profiler.phase(name) if profiler is not None else _no_phase
+
+
 # --- Класи ---
 class Wall(pygame.sprite.Sprite):
     """Клас для створення стін лабіринту"""
@@ -41,7 +210,7 @@ class Wall(pygame.sprite.Sprite):
         self.rect.left = x
 
 
-class Block(pygame.sprite.Sprite):
+class Block(pygame.sprite.DirtySprite):
     """Клас для точок, які збирає Пакмен"""
 
     def __init__(self, color, width, height):
@@ -53,17 +222,36 @@ class Block(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
 
 
-class Player(pygame.sprite.Sprite):
+class HudText(pygame.sprite.DirtySprite):
+    """Напис інтерфейсу, який рендериться заново лише при зміні тексту чи кольору"""
+
+    def __init__(self, font, anchor, align="left"):
+        super().__init__()
+        self.font = font
+        self.anchor = anchor
+        self.align = align
+        self.content = None
+        self.image = pygame.Surface([0, 0])
+        self.rect = self.image.get_rect(topleft=anchor)
+
+    def set_text(self, text, color):
+        if self.content == (text, color): return
+        self.content = (text, color)
+        self.image = self.font.render(text, True, color)
+        if self.align == "right":
+            self.rect = self.image.get_rect(topright=self.anchor)
+        else:
+            self.rect = self.image.get_rect(topleft=self.anchor)
+        self.dirty = 1
+
+
+class Player(pygame.sprite.DirtySprite):
     """Базовий клас для рухомих об'єктів (Пакмен та Привиди)"""
 
     def __init__(self, x, y, filename):
         super().__init__()
-        try:
-            self.image = pygame.image.load(filename).convert_alpha()
-        except pygame.error:
-            self.image = pygame.Surface([20, 20])
-            self.image.fill(YELLOW)
-            print(f"Попередження: Не знайдено файл {filename}. Використовується жовтий квадрат.")
+        self.image = load_image(filename)
+        self.dirty = 2  # Рухомі об'єкти перемальовуються щокадру
 
         self.rect = self.image.get_rect()
         self.rect.top = y
@@ -76,14 +264,15 @@ class Player(pygame.sprite.Sprite):
         self.change_y = y
 
     def update(self, walls, gate=None):
+        grid = get_maze_grid(walls)
         old_x = self.rect.left
         self.rect.left += self.change_x
-        if pygame.sprite.spritecollide(self, walls, False):
+        if not grid.is_free(*self.rect):
             self.rect.left = old_x
 
         old_y = self.rect.top
         self.rect.top += self.change_y
-        if pygame.sprite.spritecollide(self, walls, False):
+        if not grid.is_free(*self.rect):
             self.rect.top = old_y
 
         if gate and pygame.sprite.spritecollide(self, gate, False):
@@ -94,19 +283,20 @@ class Player(pygame.sprite.Sprite):
 class Ghost(Player):
     """Клас, що описує поведінку привидів"""
 
-    def __init__(self, x, y, filename, ghost_type, speed):
+    def __init__(self, x, y, filename, ghost_type, speed, difficulty=1, patrol_points=None):
         super().__init__(x, y, filename)
         self.ghost_type = ghost_type
         self.speed = speed
+        self.difficulty = difficulty
         self.last_seen_pacman_pos = None
         self.is_stuck_counter = 0
         self.last_position = (x, y)
         self.current_direction = (0, 0)
-        self.patrol_points = self._get_patrol_route()
+        self.patrol_points = [tuple(point) for point in patrol_points] if patrol_points else self._get_patrol_route()
         self.patrol_index = 0
 
     def _get_patrol_route(self):
-        """Визначає маршрут патрулювання для кожного типу привида"""
+        """Маршрут патрулювання за замовчуванням (кути room_one), якщо рівень не задав свій"""
         if self.ghost_type == "blinky":
             return [(50, 50), (250, 50), (500, 50), (500, 250)]
         elif self.ghost_type == "pinky":
@@ -118,24 +308,10 @@ class Ghost(Player):
 
     def _get_available_directions(self, walls):
         """Повертає список доступних напрямків з урахуванням швидкості"""
-        possible_moves = [(0, -self.speed), (0, self.speed), (-self.speed, 0), (self.speed, 0)]
-        available = []
-        for dx, dy in possible_moves:
-            test_rect = self.rect.move(dx, dy)
-            if not any(wall.rect.colliderect(test_rect) for wall in walls):
-                available.append((dx, dy))
-        return available
+        return get_maze_grid(walls).available_moves(self.rect, self.speed)
 
     def _has_line_of_sight(self, target_pos, walls):
-        start_pos = self.rect.center
-        for i in range(0, 101, 5):
-            t = i / 100
-            check_x = int(start_pos[0] * (1 - t) + target_pos[0] * t)
-            check_y = int(start_pos[1] * (1 - t) + target_pos[1] * t)
-            for wall in walls:
-                if wall.rect.collidepoint(check_x, check_y):
-                    return False
-        return True
+        return get_maze_grid(walls).has_line_of_sight(self.rect.center, target_pos)
 
     @staticmethod
     def _calculate_distance(pos1, pos2):
@@ -146,8 +322,10 @@ class Ghost(Player):
         if not available: return (0, 0)
         if len(available) > 1 and (-self.current_direction[0], -self.current_direction[1]) in available:
             available.remove((-self.current_direction[0], -self.current_direction[1]))
+        # Рухаємося до наступного вузла найкоротшого шляху, а не напряму до цілі
+        waypoint = get_maze_grid(walls).navigation(self.rect.size).waypoint(self.rect.center, target)
         best_move = min(available, key=lambda move: self._calculate_distance(
-            (self.rect.x + move[0], self.rect.y + move[1]), target))
+            (self.rect.centerx + move[0], self.rect.centery + move[1]), waypoint))
         return best_move
 
     def _patrol(self, walls):
@@ -179,9 +357,9 @@ class Ghost(Player):
             if self._has_line_of_sight(pacman_pos, walls):
                 self.last_seen_pacman_pos = pacman_pos
 
-            if DIFFICULTY_LEVEL == 1:
+            if self.difficulty == 1:
                 self.current_direction = self._level1_behavior(pacman, walls)
-            elif DIFFICULTY_LEVEL == 2:
+            elif self.difficulty == 2:
                 self.current_direction = self._level2_behavior(pacman, walls, other_ghosts)
             else:
                 self.current_direction = self._level3_behavior(pacman, walls, other_ghosts)
@@ -240,44 +418,846 @@ class Ghost(Player):
             return self._move_towards_target(self.last_seen_pacman_pos, walls)
         else:
             if self._calculate_distance(self.rect.center, pacman_pos) > 200:
-                return self._move_towards_target((SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2), walls)
+                return self._move_towards_target(get_maze_grid(walls).center, walls)
             return self._move_towards_target(self.last_seen_pacman_pos, walls)
 
 
+# --- Навігаційна сітка лабіринту ---
+
+class MazeGrid:
+    """
+    Растрова модель лабіринту, яка будується один раз для прямокутників стін.
+    Розмір клітинки дорівнює НСД координат і розмірів стін, тому растр
+    відтворює стіни точно. Перевірка прямокутника на зіткнення виконується
+    за O(1) через таблицю префіксних сум, а допустимі ходи кешуються
+    для кожної позиції, розміру та швидкості. nav_step і nav_origin задають
+    решітку графів проходів (див. NavGraph) для коридорів цього лабіринту.
+    """
+
+    def __init__(self, rects, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, nav_step=NAV_STEP, nav_origin=NAV_ORIGIN):
+        self.tile = self._tile_size(rects)
+        self.nav_step = nav_step
+        self.nav_origin = nav_origin
+        # Центр лабіринту - середина прямокутника, що охоплює всі стіни
+        if rects:
+            self.center = ((min(rect.left for rect in rects) + max(rect.right for rect in rects)) / 2,
+                           (min(rect.top for rect in rects) + max(rect.bottom for rect in rects)) / 2)
+        else:
+            self.center = (width / 2, height / 2)
+        width = max([width] + [rect.right for rect in rects])
+        height = max([height] + [rect.bottom for rect in rects])
+        self.cols = -(-width // self.tile)
+        self.rows = -(-height // self.tile)
+
+        # Сітка зайнятості: True, якщо клітинку займає стіна
+        self.occupied = [[False] * self.cols for _ in range(self.rows)]
+        for rect in rects:
+            for row in range(max(rect.top, 0) // self.tile, -(-rect.bottom // self.tile)):
+                for col in range(max(rect.left, 0) // self.tile, -(-rect.right // self.tile)):
+                    self.occupied[row][col] = True
+
+        # Таблиця префіксних сум: sums[r][c] - кількість зайнятих клітинок вище та лівіше (r, c)
+        self._sums = [[0] * (self.cols + 1)]
+        for row in self.occupied:
+            above = self._sums[-1]
+            line = [0]
+            for col, cell in enumerate(row):
+                line.append(line[-1] + above[col + 1] - above[col] + cell)
+            self._sums.append(line)
+
+        self._moves_cache = {}
+        self._sight_cache = {}
+        self._navigation = {}
+
+    @staticmethod
+    def _tile_size(rects):
+        tile = 0
+        for rect in rects:
+            for value in (rect.left, rect.top, rect.width, rect.height):
+                tile = math.gcd(tile, value)
+        return tile or 1
+
+    def to_snapshot(self):
+        """
+        Повертає стан сітки та побудованих графів проходів у вигляді вбудованих
+        типів Python. Кеші ходів і видимості заповнюються під час гри і не зберігаються.
+        """
+        return {
+            "tile": self.tile,
+            "cols": self.cols,
+            "rows": self.rows,
+            "occupied": self.occupied,
+            "sums": self._sums,
+            "nav_step": self.nav_step,
+            "nav_origin": self.nav_origin,
+            "center": self.center,
+            "navigation": {size: {key: value for key, value in vars(graph).items() if key != "grid"}
+                           for size, graph in self._navigation.items()},
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        grid = cls.__new__(cls)
+        grid.tile = snapshot["tile"]
+        grid.cols = snapshot["cols"]
+        grid.rows = snapshot["rows"]
+        grid.occupied = snapshot["occupied"]
+        grid._sums = snapshot["sums"]
+        grid.nav_step = snapshot["nav_step"]
+        grid.nav_origin = snapshot["nav_origin"]
+        grid.center = tuple(snapshot["center"])
+        grid._moves_cache = {}
+        grid._sight_cache = {}
+        grid._navigation = {}
+        for size, state in snapshot["navigation"].items():
+            graph = NavGraph.__new__(NavGraph)
+            graph.__dict__.update(state)
+            graph.grid = grid
+            grid._navigation[size] = graph
+        return grid
+
+    def is_free(self, x, y, width, height):
+        """Чи не перетинає прямокутник жодної стіни"""
+        if profiler is not None: profiler.count("wall_checks")
+        col_start = max(x // self.tile, 0)
+        row_start = max(y // self.tile, 0)
+        col_end = min((x + width - 1) // self.tile + 1, self.cols)
+        row_end = min((y + height - 1) // self.tile + 1, self.rows)
+        if col_start >= col_end or row_start >= row_end:
+            return True
+        sums = self._sums
+        blocked = (sums[row_end][col_end] - sums[row_start][col_end]
+                   - sums[row_end][col_start] + sums[row_start][col_start])
+        return blocked == 0
+
+    def available_moves(self, rect, speed):
+        """Повертає список ходів (dx, dy) на відстань speed, які не впираються у стіну"""
+        key = (rect.x, rect.y, rect.width, rect.height, speed)
+        moves = self._moves_cache.get(key)
+        if profiler is not None:
+            profiler.count("move_queries")
+            profiler.count("move_cache_misses", int(moves is None))
+        if moves is None:
+            moves = tuple((dx, dy) for dx, dy in ((0, -speed), (0, speed), (-speed, 0), (speed, 0))
+                          if self.is_free(rect.x + dx, rect.y + dy, rect.width, rect.height))
+            self._moves_cache[key] = moves
+        return list(moves)
+
+    def navigation(self, size):
+        """Повертає граф проходів для агента розміру size (width, height)"""
+        size = tuple(size)
+        graph = self._navigation.get(size)
+        if graph is None:
+            graph = self._navigation[size] = NavGraph(self, size, self.nav_step, self.nav_origin)
+        return graph
+
+    def cell_at(self, x, y):
+        """Повертає клітинку (стовпець, рядок), у яку потрапляє точка"""
+        return int(x) // self.tile, int(y) // self.tile
+
+    def has_line_of_sight(self, start_pos, end_pos):
+        """
+        Перевіряє видимість між двома точками. Відрізок між центрами їхніх
+        клітинок трасується по сітці (суперпокриття Брезенхема), тому жодна
+        стіна на шляху не пропускається. Результат кешується за парою клітинок
+        і спільний для всіх привидів.
+        """
+        start = self.cell_at(*start_pos)
+        end = self.cell_at(*end_pos)
+        key = (start, end) if start <= end else (end, start)
+        visible = self._sight_cache.get(key)
+        if profiler is not None:
+            profiler.count("los_checks")
+            profiler.count("los_traces", int(visible is None))
+        if visible is None:
+            if len(self._sight_cache) >= SIGHT_CACHE_LIMIT:
+                self._sight_cache.clear()
+            visible = self._trace(key[0], key[1])
+            self._sight_cache[key] = visible
+        return visible
+
+    def _is_occupied(self, col, row):
+        return 0 <= row < self.rows and 0 <= col < self.cols and self.occupied[row][col]
+
+    def _trace(self, start, end):
+        col, row = start
+        dx = abs(end[0] - col)
+        dy = abs(end[1] - row)
+        step_x = 1 if end[0] > col else -1
+        step_y = 1 if end[1] > row else -1
+        error = dx - dy
+        for _ in range(dx + dy + 1):
+            if self._is_occupied(col, row):
+                return False
+            if (col, row) == end:
+                break
+            if error > 0:
+                col += step_x
+                error -= 2 * dy
+            elif error < 0:
+                row += step_y
+                error += 2 * dx
+            else:
+                # Відрізок проходить точно через кут: перевіряємо обидві сусідні клітинки
+                if self._is_occupied(col + step_x, row) or self._is_occupied(col, row + step_y):
+                    return False
+                col += step_x
+                row += step_y
+                error += 2 * (dx - dy)
+        return True
+
+
+class NavGraph:
+    """
+    Граф проходів лабіринту для агента заданого розміру. Вузли - точки решітки
+    з кроком NAV_STEP, у яких агент вміщується, ребра - прямі переходи між
+    сусідніми вузлами. Для невеликих лабіринтів одразу будується таблиця
+    наступного кроку для всіх пар вузлів (BFS від кожної цілі), для великих
+    шляхи знаходяться через A* і поступово доповнюють ту саму таблицю.
+    """
+
+    def __init__(self, grid, size, step=NAV_STEP, origin=NAV_ORIGIN):
+        self.grid = grid
+        self.width, self.height = size
+        self.step = step
+        self.origin = origin
+        self.cols = (grid.cols * grid.tile - origin) // step + 1
+        self.rows = (grid.rows * grid.tile - origin) // step + 1
+
+        self.nodes = {(i, j) for j in range(self.rows) for i in range(self.cols)
+                      if self._fits(self.node_center((i, j)), self.node_center((i, j)))}
+        self.neighbours = {}
+        for node in self.nodes:
+            i, j = node
+            self.neighbours[node] = [other for other in ((i, j - 1), (i, j + 1), (i - 1, j), (i + 1, j))
+                                     if other in self.nodes and
+                                     self._fits(self.node_center(node), self.node_center(other))]
+
+        # next_hop[ціль][вузол] - сусідній вузол, через який лежить найкоротший шлях до цілі
+        # (None - ціль недосяжна); distance[ціль][вузол] - довжина шляхів, знайдених A*
+        self.next_hop = {}
+        self.distance = {}
+        if len(self.nodes) <= NAV_ALL_PAIRS_LIMIT:
+            for goal in self.nodes:
+                self.next_hop[goal] = self._bfs_tree(goal)
+
+    def node_center(self, node):
+        return self.origin + node[0] * self.step, self.origin + node[1] * self.step
+
+    def _fits(self, center_a, center_b):
+        """Чи вільна смуга, яку агент замітає при русі між двома центрами"""
+        left = min(center_a[0], center_b[0]) - self.width // 2
+        top = min(center_a[1], center_b[1]) - self.height // 2
+        right = max(center_a[0], center_b[0]) - self.width // 2 + self.width
+        bottom = max(center_a[1], center_b[1]) - self.height // 2 + self.height
+        return self.grid.is_free(left, top, right - left, bottom - top)
+
+    def _bfs_tree(self, goal):
+        tree = {goal: goal}
+        queue = deque([goal])
+        while queue:
+            node = queue.popleft()
+            for other in self.neighbours[node]:
+                if other not in tree:
+                    tree[other] = node
+                    queue.append(other)
+        return tree
+
+    def nearest_node(self, pos):
+        """Повертає найближчий до точки вузол графа (або None, якщо граф порожній)"""
+        if not self.nodes:
+            return None
+        i = min(max(round((pos[0] - self.origin) / self.step), 0), self.cols - 1)
+        j = min(max(round((pos[1] - self.origin) / self.step), 0), self.rows - 1)
+        candidates = self.snap_candidates(i, j)
+        if not candidates:
+            return None
+        return min(candidates, key=lambda node: math.dist(self.node_center(node), pos))
+
+    def snap_candidates(self, i, j):
+        """Вузли, серед яких шукається найближчий до точки решітки (i, j): вона сама або найближче кільце"""
+        if (i, j) in self.nodes:
+            return [(i, j)]
+        for radius in range(1, max(self.cols, self.rows)):
+            ring = [(x, y) for x in range(i - radius, i + radius + 1)
+                    for y in range(j - radius, j + radius + 1)
+                    if max(abs(x - i), abs(y - j)) == radius and (x, y) in self.nodes]
+            if ring:
+                return ring
+        return []
+
+    def _a_star(self, start, goal):
+        """
+        Шукає найкоротший шлях через A* і записує його кроки до таблиці next_hop.
+        Вузол з уже відомою відстанню до цілі завершує шлях кандидатом
+        cost + distance; пошук триває, доки якийсь нерозкритий вузол (оцінка
+        Манхеттена не перевищує справжньої довжини) ще може дати коротший.
+        Якщо ціль недосяжна, для всіх пройдених вузлів записується None.
+        """
+        tree = self.next_hop.setdefault(goal, {goal: goal})
+        known = self.distance.setdefault(goal, {goal: 0})
+        counter = 0
+        frontier = [(abs(start[0] - goal[0]) + abs(start[1] - goal[1]), counter, start)]
+        came_from = {start: None}
+        cost = {start: 0}
+        best, exit_node = math.inf, None
+        while frontier and frontier[0][0] < best:
+            node = heapq.heappop(frontier)[2]
+            if node in known:
+                if cost[node] + known[node] < best:
+                    best, exit_node = cost[node] + known[node], node
+                continue
+            for other in self.neighbours[node]:
+                new_cost = cost[node] + 1
+                if new_cost < cost.get(other, new_cost + 1):
+                    cost[other] = new_cost
+                    came_from[other] = node
+                    counter += 1
+                    priority = new_cost + abs(other[0] - goal[0]) + abs(other[1] - goal[1])
+                    heapq.heappush(frontier, (priority, counter, other))
+        if exit_node is None:
+            for node in came_from:
+                tree.setdefault(node, None)
+            return None
+        # Відомий відрізок шляху вже є у таблиці, дописуємо лише нову частину
+        node = exit_node
+        while came_from[node] is not None:
+            tree[came_from[node]] = node
+            known[came_from[node]] = known[node] + 1
+            node = came_from[node]
+        return tree[start]
+
+    def waypoint(self, pos, target):
+        """
+        Повертає точку, до якої варто рухатися з pos, щоб дістатися target
+        найкоротшим шляхом: центр наступного вузла або саму ціль.
+        """
+        start = self.nearest_node(pos)
+        goal = self.nearest_node(target)
+        if start is None or start == goal:
+            return target
+        tree = self.next_hop.get(goal, {})
+        if start in tree:
+            hop = tree[start]
+        elif len(self.nodes) > NAV_ALL_PAIRS_LIMIT:
+            hop = self._a_star(start, goal)
+        else:
+            hop = None
+        if hop is None:
+            return target
+        return self.node_center(hop)
+
+
+class SpatialHash:
+    """
+    Рівномірна сітка для пошуку спрайтів, які перетинають прямокутник.
+    Кожен спрайт записується в усі клітинки, які накриває його rect,
+    тому запит перевіряє лише сусідні об'єкти, а не всю групу.
+    """
+
+    def __init__(self, cell_size, sprites=()):
+        self.cell_size = cell_size
+        self.cells = {}
+        self._sprite_cells = {}
+        self._order = {}
+        for sprite in sprites:
+            self.add(sprite)
+
+    def __len__(self):
+        return len(self._sprite_cells)
+
+    def _cells(self, rect):
+        size = self.cell_size
+        return [(col, row)
+                for row in range(rect.top // size, (rect.bottom - 1) // size + 1)
+                for col in range(rect.left // size, (rect.right - 1) // size + 1)]
+
+    def add(self, sprite):
+        cells = self._cells(sprite.rect)
+        self._sprite_cells[sprite] = cells
+        self._order.setdefault(sprite, len(self._order))
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(sprite)
+
+    def remove(self, sprite):
+        for cell in self._sprite_cells.pop(sprite, ()):
+            bucket = self.cells[cell]
+            bucket.discard(sprite)
+            if not bucket:
+                del self.cells[cell]
+
+    def move(self, sprite):
+        """Оновлює клітинки спрайта після зміни його rect"""
+        if self._cells(sprite.rect) != self._sprite_cells.get(sprite):
+            self.remove(sprite)
+            self.add(sprite)
+
+    def collide(self, rect):
+        """Повертає спрайти, що перетинають rect, у порядку додавання"""
+        found = set()
+        for cell in self._cells(rect):
+            for sprite in self.cells.get(cell, ()):
+                if sprite not in found and sprite.rect.colliderect(rect):
+                    found.add(sprite)
+        return sorted(found, key=self._order.__getitem__)
+
+
+def get_maze_grid(walls):
+    """Повертає навігаційну сітку для групи стін, будуючи її за потреби"""
+    grid = getattr(walls, "grid", None)
+    if grid is None:
+        grid = walls.grid = MazeGrid([wall.rect for wall in walls])
+    return grid
+
+
+# --- Пакетне оновлення привидів (NumPy) ---
+
+GHOST_TYPES = ["blinky", "pinky", "inky", "clyde"]
+_swarm_tables = weakref.WeakKeyDictionary()
+
+
+def _build_swarm_tables(graph):
+    """
+    Перетворює сітку та граф проходів на масиви NumPy для GhostSwarm:
+    карту вільних позицій лівого верхнього кута агента, кандидатів для
+    прив'язки точок решітки до вузлів, центри вузлів і матрицю наступного кроку.
+    Для графів, більших за NAV_ALL_PAIRS_LIMIT, матриця не будується
+    (next_hop = None): кроки шукаються на вимогу через NavGraph._a_star.
+    """
+    grid = graph.grid
+    width, height = graph.width, graph.height
+    sums = np.array(grid._sums, dtype=np.int64)
+
+    def spans(length, size, count):
+        coords = np.arange(length)
+        start = np.clip(coords // grid.tile, 0, count)
+        end = np.clip((coords + size - 1) // grid.tile + 1, 0, count)
+        return start, end
+
+    col_start, col_end = spans(grid.cols * grid.tile, width, grid.cols)
+    row_start, row_end = spans(grid.rows * grid.tile, height, grid.rows)
+    blocked = (sums[np.ix_(row_end, col_end)] - sums[np.ix_(row_start, col_end)]
+               - sums[np.ix_(row_end, col_start)] + sums[np.ix_(row_start, col_start)])
+    free = blocked == 0
+
+    nodes = sorted(graph.nodes)
+    node_id = {node: i for i, node in enumerate(nodes)}
+    centers = np.array([graph.node_center(node) for node in nodes], dtype=np.float64).reshape(-1, 2)
+    candidates = [[graph.snap_candidates(i, j) for i in range(graph.cols)] for j in range(graph.rows)]
+    ring_size = max((len(c) for row in candidates for c in row), default=1)
+    snap = np.full((graph.rows, graph.cols, ring_size), -1, dtype=np.int64)
+    for j, row in enumerate(candidates):
+        for i, nodes_near in enumerate(row):
+            snap[j, i, :len(nodes_near)] = [node_id[node] for node in nodes_near]
+
+    tables = {"free": free, "snap": snap, "centers": centers, "nodes": nodes, "node_id": node_id, "next_hop": None}
+    if len(nodes) > NAV_ALL_PAIRS_LIMIT:
+        return tables
+
+    next_hop = tables["next_hop"] = np.full((len(nodes), len(nodes)), -1, dtype=np.int64)
+    for goal in nodes:
+        tree = graph.next_hop.get(goal)
+        if tree is None:
+            tree = graph._bfs_tree(goal)
+        for node, hop in tree.items():
+            if hop is not None:
+                next_hop[node_id[goal], node_id[node]] = node_id[hop]
+    return tables
+
+
+class GhostSwarm:
+    """
+    Оновлює всіх привидів одним векторизованим проходом. Позиції, напрямки,
+    лічильники та цілі зберігаються в масивах NumPy; кандидатні ходи, цілі
+    рівнів складності (зокрема ціль inky відносно blinky) і відстані до них
+    обчислюються для всіх привидів одночасно. Правила ті самі, що в
+    Ghost.update_behavior, але привиди рухаються синхронно: кожен бачить
+    позиції інших на початку такту. Спрайти Ghost лишаються для малювання
+    та зіткнень, їхні rect оновлюються після кожного кроку.
+    """
+
+    def __init__(self, ghosts, walls, difficulty=1, seed=None):
+        if np is None:
+            raise RuntimeError("Для GhostSwarm потрібен NumPy")
+        sizes = {ghost.rect.size for ghost in ghosts}
+        if len(sizes) != 1:
+            raise ValueError("Усі привиди в GhostSwarm мають бути однакового розміру")
+
+        self.ghosts = list(ghosts)
+        self.grid = get_maze_grid(walls)
+        self.graph = self.grid.navigation(sizes.pop())
+        tables = _swarm_tables.get(self.graph)
+        if tables is None:
+            tables = _swarm_tables[self.graph] = _build_swarm_tables(self.graph)
+        self.free = tables["free"]
+        self.snap = tables["snap"]
+        self.centers = tables["centers"]
+        self.nodes = tables["nodes"]
+        self.node_id = tables["node_id"]
+        self.next_hop = tables["next_hop"]
+
+        self.difficulty = difficulty
+        self.rng = np.random.default_rng(random.getrandbits(32) if seed is None else seed)
+        self.half = np.array([self.graph.width // 2, self.graph.height // 2])
+
+        self.pos = np.array([ghost.rect.topleft for ghost in self.ghosts], dtype=np.int64).reshape(-1, 2)
+        self.direction = np.array([ghost.current_direction for ghost in self.ghosts], dtype=np.int64).reshape(-1, 2)
+        self.speed = np.array([ghost.speed for ghost in self.ghosts], dtype=np.int64)
+        self.kind = np.array([GHOST_TYPES.index(ghost.ghost_type) if ghost.ghost_type in GHOST_TYPES else 3
+                              for ghost in self.ghosts], dtype=np.int64)
+        # Маршрути різної довжини доповнюються останньою точкою; patrol_length - справжня довжина
+        longest = max((len(ghost.patrol_points) for ghost in self.ghosts), default=1)
+        self.patrol = np.array([ghost.patrol_points + ghost.patrol_points[-1:] * (longest - len(ghost.patrol_points))
+                                for ghost in self.ghosts], dtype=np.float64).reshape(-1, longest, 2)
+        self.patrol_length = np.array([len(ghost.patrol_points) for ghost in self.ghosts], dtype=np.int64)
+        self.patrol_index = np.array([ghost.patrol_index for ghost in self.ghosts], dtype=np.int64)
+        self.last_position = self.pos.copy()
+        self.stuck = np.zeros(len(self.ghosts), dtype=np.int64)
+        self.last_seen = np.zeros((len(self.ghosts), 2), dtype=np.float64)
+        self.seen = np.zeros(len(self.ghosts), dtype=bool)
+
+        # Кандидатні ходи в порядку Ghost._get_available_directions: вгору, вниз, вліво, вправо
+        unit = np.array([(0, -1), (0, 1), (-1, 0), (1, 0)], dtype=np.int64)
+        self.moves = unit[None, :, :] * self.speed[:, None, None]
+
+    def _is_free(self, x, y):
+        if profiler is not None: profiler.count("wall_checks", np.size(x))
+        height, width = self.free.shape
+        return self.free[np.clip(y, 0, height - 1), np.clip(x, 0, width - 1)]
+
+    def _snap(self, points):
+        """Векторний аналог NavGraph.nearest_node: індекси вузлів (або -1)"""
+        cols, rows = self.graph.cols, self.graph.rows
+        i = np.clip(np.round((points[:, 0] - self.graph.origin) / self.graph.step), 0, cols - 1).astype(np.int64)
+        j = np.clip(np.round((points[:, 1] - self.graph.origin) / self.graph.step), 0, rows - 1).astype(np.int64)
+        candidates = self.snap[j, i]
+        offsets = self.centers[np.maximum(candidates, 0)] - points[:, None, :]
+        distances = np.hypot(offsets[..., 0], offsets[..., 1])
+        distances[candidates < 0] = np.inf
+        return candidates[np.arange(len(points)), np.argmin(distances, axis=1)]
+
+    def _hops(self, goals, starts):
+        """Наступні кроки для великого графа: лише для потрібних пар, через таблицю NavGraph і A*"""
+        hops = np.full(len(goals), -1, dtype=np.int64)
+        for k, (goal, start) in enumerate(zip(goals, starts)):
+            if goal < 0 or start < 0 or goal == start:
+                continue
+            goal, start = self.nodes[goal], self.nodes[start]
+            tree = self.graph.next_hop.get(goal, {})
+            hop = tree[start] if start in tree else self.graph._a_star(start, goal)
+            if hop is not None:
+                hops[k] = self.node_id[hop]
+        return hops
+
+    def _available(self):
+        candidates = self.pos[:, None, :] + self.moves
+        return self._is_free(candidates[..., 0], candidates[..., 1])
+
+    def _random_moves(self, available):
+        """Для кожного привида - випадковий доступний хід (або (0, 0), якщо ходів немає)"""
+        count = available.sum(axis=1)
+        pick = (self.rng.random(len(count)) * count).astype(np.int64)
+        choice = np.argmax(np.cumsum(available, axis=1) > pick[:, None], axis=1)
+        moves = self.moves[np.arange(len(count)), choice]
+        return np.where((count > 0)[:, None], moves, 0)
+
+    def _towards(self, centers, targets, available):
+        """Векторний аналог Ghost._move_towards_target"""
+        available = available.copy()
+        reverse = (self.moves == -self.direction[:, None, :]).all(axis=2) & available
+        drop_reverse = (available.sum(axis=1) > 1) & reverse.any(axis=1)
+        available[drop_reverse] &= ~reverse[drop_reverse]
+
+        start = self._snap(centers)
+        goal = self._snap(targets)
+        hop = self.next_hop[goal, start] if self.next_hop is not None else self._hops(goal, start)
+        direct = (start == goal) | (hop < 0) | (start < 0)
+        waypoints = np.where(direct[:, None], targets, self.centers[np.maximum(hop, 0)])
+
+        moved = centers[:, None, :] + self.moves
+        distances = np.hypot(moved[..., 0] - waypoints[:, None, 0], moved[..., 1] - waypoints[:, None, 1])
+        distances[~available] = np.inf
+        best = self.moves[np.arange(len(centers)), np.argmin(distances, axis=1)]
+        return np.where(available.any(axis=1)[:, None], best, 0)
+
+    def _patrol_targets(self, centers, mask):
+        """Поточні точки патрулювання; для привидів з mask, що дійшли до точки, індекс зсувається"""
+        rows = np.arange(len(centers))
+        targets = self.patrol[rows, self.patrol_index]
+        reached = mask & (np.hypot(*(centers - targets).T) < self.speed)
+        self.patrol_index[reached] = (self.patrol_index[reached] + 1) % self.patrol_length[reached]
+        return targets
+
+    def step(self, pacman, mode):
+        """Виконує один такт для всіх привидів і оновлює їхні спрайти"""
+        centers = (self.pos + self.half).astype(np.float64)
+        available = self._available()
+
+        if mode == "scatter":
+            self.direction = self._towards(centers, self.patrol[:, 0], available)
+        else:
+            same = (self.pos == self.last_position).all(axis=1)
+            self.stuck = np.where(same, self.stuck + 1, 0)
+            self.last_position = self.pos.copy()
+            stuck = self.stuck > 5
+            self.stuck[stuck] = 0
+
+            pacman_pos = np.array(pacman.rect.center, dtype=np.float64)
+            pacman_move = np.array([pacman.change_x, pacman.change_y], dtype=np.float64)
+            sight = np.array([not is_stuck and self.grid.has_line_of_sight(tuple(center), pacman.rect.center)
+                              for is_stuck, center in zip(stuck, centers)], dtype=bool)
+            self.seen |= sight
+            self.last_seen[sight] = pacman_pos
+
+            blinkies = np.flatnonzero(self.kind == 0)
+            blinky_pos = centers[blinkies[0]] if len(blinkies) else None
+            distance = np.hypot(*(centers - pacman_pos).T)
+            blinky, pinky, inky, clyde = (self.kind == k for k in range(4))
+
+            # За замовчуванням - патрулювання; далі кожен рівень задає свої цілі
+            patrol = ~self.seen
+            randomly = np.zeros(len(centers), dtype=bool)
+            targets = self.last_seen.copy()
+            if self.difficulty == 1:
+                patrol |= pinky | (inky & ~sight)
+                randomly = self.seen & clyde & (self.rng.random(len(centers)) < 0.6)
+            elif self.difficulty == 2:
+                targets[blinky] = pacman_pos + pacman_move * 2
+                targets[pinky] = pacman_pos + pacman_move * 4
+                targets[inky] = 2 * pacman_pos - (blinky_pos if blinky_pos is not None else pacman_pos)
+                near = clyde & (distance < 150)
+                targets[near] = self.patrol[near, 0]
+            else:
+                targets[pinky] = pacman_pos + np.array([-pacman_move[1], pacman_move[0]]) * 3
+                if blinky_pos is not None:
+                    targets[inky] = (pacman_pos + blinky_pos) // 2
+                far = clyde & (distance > 200)
+                targets[far] = self.grid.center
+
+            patrol_targets = self._patrol_targets(centers, patrol & ~stuck)
+            targets = np.where(patrol[:, None], patrol_targets, targets)
+            direction = self._towards(centers, targets, available)
+            random_moves = self._random_moves(available)
+            direction = np.where(randomly[:, None], random_moves, direction)
+            # Застряглий привид обирає випадковий доступний хід, а без ходів зберігає напрямок
+            unstuck = np.where(available.any(axis=1)[:, None], random_moves, self.direction)
+            self.direction = np.where(stuck[:, None], unstuck, direction)
+
+        # Рух як у Player.update: спочатку по x, потім по y, з відкатом при зіткненні зі стіною
+        new_x = self.pos[:, 0] + self.direction[:, 0]
+        x = np.where(self._is_free(new_x, self.pos[:, 1]), new_x, self.pos[:, 0])
+        new_y = self.pos[:, 1] + self.direction[:, 1]
+        y = np.where(self._is_free(x, new_y), new_y, self.pos[:, 1])
+        self.pos = np.stack([x, y], axis=1)
+
+        for ghost, (gx, gy), (dx, dy) in zip(self.ghosts, self.pos.tolist(), self.direction.tolist()):
+            ghost.rect.topleft = (gx, gy)
+            ghost.current_direction = (dx, dy)
+            ghost.set_speed(dx, dy)
+
+
 # --- Функції налаштування гри ---
 
-def setupRoomOne(all_sprites_list):
+def setupRoomOne(all_sprites_list, level=None):
+    level = level or load_level()
     wall_list = pygame.sprite.RenderPlain()
-    walls_coords = [
-        [0, 0, 6, 600], [0, 0, 600, 6], [0, 600, 606, 6], [600, 0, 6, 606], [300, 0, 6, 66],
-        [60, 60, 186, 6], [360, 60, 186, 6], [60, 120, 66, 6], [60, 120, 6, 126], [180, 120, 246, 6],
-        [300, 120, 6, 66], [480, 120, 66, 6], [540, 120, 6, 126], [120, 180, 126, 6],
-        [120, 180, 6, 126], [360, 180, 126, 6], [480, 180, 6, 126], [180, 240, 6, 126],
-        [180, 360, 246, 6], [420, 240, 6, 126], [240, 240, 42, 6], [324, 240, 42, 6],
-        [240, 240, 6, 66], [240, 300, 126, 6], [360, 240, 6, 66], [0, 300, 66, 6],
-        [540, 300, 66, 6], [60, 360, 66, 6], [60, 360, 6, 186], [480, 360, 66, 6],
-        [540, 360, 6, 186], [120, 420, 366, 6], [120, 420, 6, 66], [480, 420, 6, 66],
-        [180, 480, 246, 6], [300, 480, 6, 66], [120, 540, 126, 6], [360, 540, 126, 6]
-    ]
-    for item in walls_coords:
+    for item in level.walls:
         wall = Wall(item[0], item[1], item[2], item[3], BLUE)
         wall_list.add(wall)
         all_sprites_list.add(wall)
+    wall_list.grid = level.grid
     return wall_list
 
 
-def setupGate(all_sprites_list):
+def setupGate(all_sprites_list, level=None):
+    level = level or load_level()
     gate = pygame.sprite.RenderPlain()
-    gate.add(Wall(282, 242, 42, 2, WHITE))
+    if level.gate:
+        gate.add(Wall(*level.gate, WHITE))
     all_sprites_list.add(gate)
     return gate
 
 
+# --- Рівні ---
+
+_level_cache = {}
+
+
+class Level:
+    """
+    Скомпільований рівень: стіни, ворота, стартові позиції, координати точок
+    і навігаційна сітка з таблицями шляхів. Створюється з JSON-файлу рівня
+    функцією load_level.
+    """
+
+    def __init__(self, data):
+        self.name = data.get("name", "")
+        self.walls = [tuple(rect) for rect in data["walls"]]
+        self.gate = tuple(data["gate"]) if data.get("gate") else None
+        self.pacman = {"file": data["pacman"]["file"], "pos": tuple(data["pacman"]["pos"])}
+        self.ghosts = [{"file": g["file"], "type": g["type"], "pos": tuple(g["pos"]),
+                        "patrol": [tuple(point) for point in g["patrol"]] if g.get("patrol") else None}
+                       for g in data["ghosts"]]
+        navigation = data.get("navigation", {})
+        self.grid = MazeGrid([pygame.Rect(rect) for rect in self.walls],
+                             nav_step=navigation.get("step", NAV_STEP), nav_origin=navigation.get("origin", NAV_ORIGIN))
+
+        pellets = data["pellets"]
+        skip = {tuple(cell) for cell in pellets.get("skip", [])}
+        size = pellets["size"]
+        self.pellet_size = size
+        self.pellets = [(pellets["step"] * column + pellets["offset"], pellets["step"] * row + pellets["offset"])
+                        for row in range(pellets["rows"]) for column in range(pellets["columns"])
+                        if (row, column) not in skip]
+        self.pellets = [(x, y) for x, y in self.pellets if self.grid.is_free(x, y, size, size)]
+
+        # Таблиці шляхів для розмірів спрайтів рівня потрапляють у кеш разом із сіткою
+        for sprite in [self.pacman] + self.ghosts:
+            self.grid.navigation(load_image(sprite["file"]).get_size())
+
+    def to_snapshot(self):
+        snapshot = {key: value for key, value in vars(self).items() if key != "grid"}
+        snapshot["grid"] = self.grid.to_snapshot()
+        return snapshot
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        level = cls.__new__(cls)
+        level.__dict__.update(snapshot)
+        level.grid = MazeGrid.from_snapshot(snapshot["grid"])
+        return level
+
+
+def load_level(filename=DEFAULT_LEVEL_FILE):
+    """
+    Повертає скомпільований рівень. Результат компіляції зберігається
+    поруч із файлом у __pycache__ під хешем його вмісту, тому повторні
+    запуски лише зчитують готовий рівень, а зміна файлу створює новий.
+    """
+    with open(filename, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha1(source + LEVEL_FORMAT_VERSION.encode()).hexdigest()
+    level = _level_cache.get(digest)
+    if level is not None:
+        return level
+
+    directory, name = os.path.split(os.path.abspath(filename))
+    cache_file = os.path.join(directory, "__pycache__", f"{os.path.splitext(name)[0]}.{digest[:16]}.pickle")
+    try:
+        with open(cache_file, "rb") as f:
+            level = Level.from_snapshot(pickle.load(f))
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+        level = Level(json.loads(source))
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file, "wb") as f:
+                pickle.dump(level.to_snapshot(), f, pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            print(f"Попередження: Не вдалося зберегти кеш рівня {cache_file}")
+
+    _level_cache[digest] = level
+    return level
+
+
+# --- Стан гри ---
+
+class Game:
+    """
+    Стан однієї партії: спрайти, рахунок і режим привидів. Не залежить
+    від екрана, подій та годинника, тому однаково працює і в ігровому
+    циклі, і в симуляції без відображення.
+    """
+
+    CHASE_TIME = 200  # 20 секунд при 10 FPS
+    SCATTER_TIME = 70  # 7 секунд при 10 FPS
+
+    def __init__(self, difficulty=1, level_file=DEFAULT_LEVEL_FILE, vectorized=False):
+        self.difficulty = difficulty
+        self.level = load_level(level_file)
+        self.all_sprites = pygame.sprite.Group()
+        self.block_list = pygame.sprite.Group()
+        self.monster_list = pygame.sprite.Group()
+
+        self.wall_list = setupRoomOne(self.all_sprites, self.level)
+        self.gate = setupGate(self.all_sprites, self.level)
+
+        pacman_data = self.level.pacman
+        self.pacman = Player(pacman_data["pos"][0], pacman_data["pos"][1], pacman_data["file"])
+        self.all_sprites.add(self.pacman)
+
+        ghost_speed = GHOST_BASE_SPEED - 2 if difficulty == 1 else GHOST_BASE_SPEED
+
+        self.ghosts = [Ghost(d["pos"][0], d["pos"][1], d["file"], d["type"], ghost_speed, difficulty, d["patrol"])
+                       for d in self.level.ghosts]
+        for ghost in self.ghosts:
+            self.all_sprites.add(ghost)
+            self.monster_list.add(ghost)
+        self.swarm = GhostSwarm(self.ghosts, self.wall_list, difficulty) if vectorized else None
+
+        for x, y in self.level.pellets:
+            block = Block(YELLOW, self.level.pellet_size, self.level.pellet_size)
+            block.rect.x = x
+            block.rect.y = y
+            self.block_list.add(block)
+            self.all_sprites.add(block)
+
+        # Просторові індекси для перевірки зіткнень Пакмена з точками та привидами
+        self.block_index = SpatialHash(SPATIAL_CELL_SIZE, self.block_list)
+        self.ghost_index = SpatialHash(SPATIAL_CELL_SIZE, self.ghosts)
+
+        self.initial_block_count = len(self.block_list)
+        self.score = 0
+        self.ticks = 0
+        self.caught_by = None
+
+        self.mode_timer = 0
+        self.current_mode = "chase"
+
+    def step(self):
+        """Виконує один такт гри. Повертає "win", "lose" або None, якщо гра триває"""
+        self.ticks += 1
+        self.mode_timer += 1
+        if self.current_mode == "chase" and self.mode_timer > self.CHASE_TIME:
+            self.current_mode = "scatter"
+            self.mode_timer = 0
+        elif self.current_mode == "scatter" and self.mode_timer > self.SCATTER_TIME:
+            self.current_mode = "chase"
+            self.mode_timer = 0
+
+        with profile_phase("pacman"):
+            self.pacman.update(self.wall_list, self.gate)
+
+        if self.swarm:
+            with profile_phase("ghosts"):
+                self.swarm.step(self.pacman, self.current_mode)
+        else:
+            # Привиди шукають у списку лише blinky, тож сам привид у ньому нічого не змінює
+            for ghost in self.ghosts:
+                with profile_phase(f"ghost_{ghost.ghost_type}"):
+                    ghost.update_behavior(self.pacman, self.wall_list, self.ghosts, self.current_mode)
+
+        with profile_phase("collisions"):
+            for ghost in self.ghosts:
+                self.ghost_index.move(ghost)
+
+            blocks_hit = self.block_index.collide(self.pacman.rect)
+            for block in blocks_hit:
+                block.kill()
+                self.block_index.remove(block)
+            self.score += len(blocks_hit)
+
+            if self.score == self.initial_block_count: return "win"
+            catchers = self.ghost_index.collide(self.pacman.rect)
+            if catchers:
+                self.caught_by = catchers[0].ghost_type
+                return "lose"
+        return None
+
+
 # --- Головні функції гри ---
 
 def select_difficulty(screen, font, small_font, clock):
-    """Екран вибору складності"""
-    global DIFFICULTY_LEVEL
+    """Екран вибору складності. Повертає обраний рівень або None для виходу"""
 
     level_descriptions = {
         1: ["Рівень 1: Легкий", "Привиди діють незалежно"],
@@ -288,17 +1268,16 @@ def select_difficulty(screen, font, small_font, clock):
     selected_level = 1
     while True:
         for event in pygame.event.get():
-            if event.type == pygame.QUIT: return False
+            if event.type == pygame.QUIT: return None
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
                     selected_level = max(1, selected_level - 1)
                 elif event.key == pygame.K_DOWN:
                     selected_level = min(3, selected_level + 1)
                 elif event.key == pygame.K_RETURN:
-                    DIFFICULTY_LEVEL = selected_level
-                    return True
+                    return selected_level
                 elif event.key == pygame.K_ESCAPE:
-                    return False
+                    return None
 
         screen.fill(BLACK)
         title = font.render("ОБЕРІТЬ РІВЕНЬ СКЛАДНОСТІ", True, YELLOW)
@@ -316,95 +1295,56 @@ def select_difficulty(screen, font, small_font, clock):
         clock.tick(10)
 
 
-def game_loop(screen, font, small_font, clock):
+def game_loop(screen, font, small_font, clock, difficulty=1, level_file=DEFAULT_LEVEL_FILE):
     """Основний ігровий цикл"""
-    all_sprites = pygame.sprite.Group()
-    block_list = pygame.sprite.Group()
-    monster_list = pygame.sprite.Group()
-
-    wall_list = setupRoomOne(all_sprites)
-    gate = setupGate(all_sprites)
-
-    pacman = Player(303 - 16, (7 * 60) + 19, "images/pacman.png")
-    all_sprites.add(pacman)
-
-    ghost_speed = GHOST_BASE_SPEED - 2 if DIFFICULTY_LEVEL == 1 else GHOST_BASE_SPEED
-
-    ghost_data = [
-        {"file": "images/Blinky.png", "type": "blinky", "pos": (60, 60)},
-        {"file": "images/Pinky.png", "type": "pinky", "pos": (520, 60)},
-        {"file": "images/Inky.png", "type": "inky", "pos": (60, 520)},
-        {"file": "images/Clyde.png", "type": "clyde", "pos": (520, 520)}
-    ]
-    ghosts = [Ghost(d["pos"][0], d["pos"][1], d["file"], d["type"], ghost_speed) for d in ghost_data]
-    for ghost in ghosts:
-        all_sprites.add(ghost)
-        monster_list.add(ghost)
-
-    for row in range(19):
-        for column in range(19):
-            if (row in [7, 8]) and (column in [8, 9, 10]): continue
-            block = Block(YELLOW, 4, 4)
-            block.rect.x = (30 * column + 6) + 26
-            block.rect.y = (30 * row + 6) + 26
-            if not pygame.sprite.spritecollide(block, wall_list, False):
-                block_list.add(block)
-                all_sprites.add(block)
-
-    initial_block_count = len(block_list)
-    score = 0
-
-    mode_timer = 0
-    current_mode = "chase"
-    CHASE_TIME = 200  # 20 секунд при 10 FPS
-    SCATTER_TIME = 70  # 7 секунд при 10 FPS
+    game = Game(difficulty, level_file)
+
+    # Стіни не змінюються, тому малюємо їх один раз на фоновій поверхні
+    background = pygame.Surface(screen.get_size()).convert()
+    background.fill(BLACK)
+    game.wall_list.draw(background)
+    game.gate.draw(background)
+
+    # Перемальовуються лише рухомі спрайти, з'їдені точки та змінені написи
+    score_text = HudText(font, (10, 10))
+    mode_text = HudText(font, (SCREEN_WIDTH - 10, 10), align="right")
+    render_group = pygame.sprite.LayeredDirty()
+    render_group.add(game.block_list.sprites(), layer=0)
+    render_group.add(game.pacman, game.ghosts, layer=1)
+    render_group.add(score_text, mode_text, layer=2)
+    overlay = ProfilerOverlay(small_font)
+    if profiler is not None:
+        render_group.add(overlay, layer=3)
+    render_group.clear(screen, background)
 
     running = True
     while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: return "quit", 0
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT:
-                    pacman.set_speed(-PACMAN_SPEED, 0)
-                elif event.key == pygame.K_RIGHT:
-                    pacman.set_speed(PACMAN_SPEED, 0)
-                elif event.key == pygame.K_UP:
-                    pacman.set_speed(0, -PACMAN_SPEED)
-                elif event.key == pygame.K_DOWN:
-                    pacman.set_speed(0, PACMAN_SPEED)
-
-        mode_timer += 1
-        if current_mode == "chase" and mode_timer > CHASE_TIME:
-            current_mode = "scatter"
-            mode_timer = 0
-        elif current_mode == "scatter" and mode_timer > SCATTER_TIME:
-            current_mode = "chase"
-            mode_timer = 0
-
-        pacman.update(wall_list, gate)
-
-        for ghost in ghosts:
-            other_ghosts = [g for g in ghosts if g != ghost]
-            ghost.update_behavior(pacman, wall_list, other_ghosts, current_mode)
-
-        blocks_hit = pygame.sprite.spritecollide(pacman, block_list, True)
-        score += len(blocks_hit)
-
-        screen.fill(BLACK)
-        all_sprites.draw(screen)
-
-        score_text = font.render(f"Рахунок: {score}/{initial_block_count}", True, WHITE)
-        mode_text_str = "Погоня!" if current_mode == 'chase' else "Перепочинок!"
-        mode_text_color = RED if current_mode == 'chase' else GREEN
-        mode_text = font.render(mode_text_str, True, mode_text_color)
-
-        screen.blit(score_text, [10, 10])
-        screen.blit(mode_text, [SCREEN_WIDTH - mode_text.get_width() - 10, 10])
-
-        if score == initial_block_count: return "win", score
-        if pygame.sprite.spritecollide(pacman, monster_list, False): return "lose", score
-
-        pygame.display.flip()
+        if profiler is not None: profiler.start_frame()
+        with profile_phase("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT: return "quit", 0
+                if event.type == pygame.KEYDOWN and event.key in PACMAN_DIRECTIONS:
+                    game.pacman.set_speed(*PACMAN_DIRECTIONS[event.key])
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    overlay.visible = not overlay.visible
+                    overlay.dirty = 1
+
+        status = game.step()
+
+        with profile_phase("render"):
+            score_text.set_text(f"Рахунок: {game.score}/{game.initial_block_count}", WHITE)
+            mode_text_str = "Погоня!" if game.current_mode == 'chase' else "Перепочинок!"
+            mode_text_color = RED if game.current_mode == 'chase' else GREEN
+            mode_text.set_text(mode_text_str, mode_text_color)
+            if profiler is not None and profiler.frames:
+                overlay.show_frame(profiler.frames[-1])
+
+            dirty_rects = render_group.draw(screen)
+            if not status:
+                pygame.display.update(dirty_rects)
+        if profiler is not None: profiler.end_frame()
+
+        if status: return status, game.score
         clock.tick(10)
 
 
@@ -432,7 +1372,124 @@ def end_screen(screen, font, message, score, clock):
         clock.tick(10)
 
 
-def main():
+# --- Симуляція без відображення ---
+
+def scripted_controller(script):
+    """
+    Керування Пакменом за сценарієм: script - словник {такт: напрямок},
+    де напрямок - одна з клавіш pygame.K_LEFT/K_RIGHT/K_UP/K_DOWN.
+    """
+    def controller(game):
+        key = script.get(game.ticks)
+        return PACMAN_DIRECTIONS[key] if key is not None else None
+    return controller
+
+
+def pellet_bot(game):
+    """
+    Простий бот: іде найкоротшим шляхом до найближчої точки, а коли
+    привид ближче за BOT_DANGER_DISTANCE - тікає від нього. З імовірністю
+    BOT_RANDOM_MOVE робить випадковий хід, щоб партії з різним seed відрізнялися.
+    """
+    pacman = game.pacman
+    grid = get_maze_grid(game.wall_list)
+    available = grid.available_moves(pacman.rect, PACMAN_SPEED)
+    if not available or not game.block_list: return None
+    if random.random() < BOT_RANDOM_MOVE: return random.choice(available)
+
+    def moved(move):
+        return pacman.rect.centerx + move[0], pacman.rect.centery + move[1]
+
+    nearest_ghost = min((ghost.rect.center for ghost in game.ghosts),
+                        key=lambda pos: Ghost._calculate_distance(pacman.rect.center, pos))
+    if Ghost._calculate_distance(pacman.rect.center, nearest_ghost) < BOT_DANGER_DISTANCE:
+        return max(available, key=lambda move: Ghost._calculate_distance(moved(move), nearest_ghost))
+
+    target = min((block.rect.center for block in game.block_list),
+                 key=lambda pos: Ghost._calculate_distance(pacman.rect.center, pos))
+    waypoint = grid.navigation(pacman.rect.size).waypoint(pacman.rect.center, target)
+    return min(available, key=lambda move: Ghost._calculate_distance(moved(move), waypoint))
+
+
+def simulate(controller=pellet_bot, max_ticks=5000, seed=None, difficulty=1, level_file=DEFAULT_LEVEL_FILE,
+             vectorized=False):
+    """
+    Грає одну партію без вікна і без обмеження FPS. controller(game)
+    щотакту повертає нову швидкість Пакмена (dx, dy) або None, щоб
+    не змінювати напрямок. Повертає словник з результатом партії.
+    """
+    if seed is not None:
+        random.seed(seed)
+    game = Game(difficulty, level_file, vectorized)
+    status = None
+    while status is None and game.ticks < max_ticks:
+        if profiler is not None: profiler.start_frame()
+        with profile_phase("controller"):
+            move = controller(game) if controller else None
+        if move is not None:
+            game.pacman.set_speed(*move)
+        status = game.step()
+        if profiler is not None: profiler.end_frame()
+    return {
+        "status": status or "timeout",
+        "difficulty": difficulty,
+        "score": game.score,
+        "pellets": game.initial_block_count,
+        "ticks": game.ticks,
+        "caught_by": game.caught_by,
+    }
+
+
+def _simulate_task(task):
+    difficulty, seed, controller, max_ticks, level_file, vectorized = task
+    return simulate(controller, max_ticks, seed, difficulty, level_file, vectorized)
+
+
+def evaluate(levels=(1, 2, 3), games=100, seed=0, controller=pellet_bot, max_ticks=5000, processes=None,
+             level_file=DEFAULT_LEVEL_FILE, vectorized=False):
+    """
+    Пакетна оцінка ШІ привидів: для кожного рівня складності грає games
+    партій (seed, seed + 1, ...) у пулі процесів на всіх ядрах. Рівні
+    використовують однакові seed, тож їх можна порівнювати напряму.
+    processes=0 грає всі партії в поточному процесі (наприклад, для профілювання).
+    Повертає звіт {рівень: статистика}.
+    """
+    tasks = [(level, seed + i, controller, max_ticks, level_file, vectorized) for level in levels for i in range(games)]
+    if processes == 0:
+        results = [_simulate_task(task) for task in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (4 * (processes or os.cpu_count() or 1)))
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_simulate_task, tasks, chunksize)
+
+    report = {}
+    for level in levels:
+        level_results = [r for r in results if r["difficulty"] == level]
+        captures = Counter(r["caught_by"] for r in level_results if r["status"] == "lose")
+        report[level] = {
+            "games": len(level_results),
+            "wins": sum(r["status"] == "win" for r in level_results),
+            "timeouts": sum(r["status"] == "timeout" for r in level_results),
+            "catch_rate": sum(captures.values()) / len(level_results),
+            "avg_survival_ticks": sum(r["ticks"] for r in level_results) / len(level_results),
+            "avg_score": sum(r["score"] for r in level_results) / len(level_results),
+            "captures": dict(captures),
+        }
+    return report
+
+
+def print_report(report):
+    """Виводить звіт evaluate у вигляді таблиці"""
+    ghost_types = ["blinky", "pinky", "inky", "clyde"]
+    print(f"{'Рівень':>6} {'Ігор':>6} {'Ловлі':>7} {'Тактів':>8} {'Рахунок':>8}  " +
+          " ".join(f"{name:>7}" for name in ghost_types))
+    for level, stats in report.items():
+        print(f"{level:>6} {stats['games']:>6} {stats['catch_rate']:>7.1%} {stats['avg_survival_ticks']:>8.1f} "
+              f"{stats['avg_score']:>8.1f}  " +
+              " ".join(f"{stats['captures'].get(name, 0):>7}" for name in ghost_types))
+
+
+def main(level_file=DEFAULT_LEVEL_FILE):
     """Головна функція, що запускає гру"""
     pygame.init()
     screen = pygame.display.set_mode([SCREEN_WIDTH, SCREEN_HEIGHT])
@@ -448,8 +1505,9 @@ def main():
     clock = pygame.time.Clock()
 
     while True:
-        if not select_difficulty(screen, font, small_font, clock): break
-        game_status, score = game_loop(screen, font, small_font, clock)
+        difficulty = select_difficulty(screen, font, small_font, clock)
+        if difficulty is None: break
+        game_status, score = game_loop(screen, font, small_font, clock, difficulty, level_file)
         if game_status == "quit": break
         message = "Перемога!" if game_status == "win" else "Гру завершено!"
         if not end_screen(screen, font, message, score, clock): break
@@ -458,4 +1516,28 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Pacman: Emergent Ghost AI")
+    parser.add_argument("--level", default=DEFAULT_LEVEL_FILE, help="JSON-файл рівня")
+    parser.add_argument("--evaluate", type=int, metavar="GAMES",
+                        help="оцінити ШІ привидів у GAMES партіях на рівень без вікна")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3], help="рівні складності для оцінки")
+    parser.add_argument("--seed", type=int, default=0, help="початковий seed партій")
+    parser.add_argument("--processes", type=int, help="кількість процесів (за замовчуванням - усі ядра)")
+    parser.add_argument("--vectorized", action="store_true", help="оновлювати привидів пакетно через NumPy")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="заміряти фази кожного кадру і зберегти у FILE (.csv або .json); "
+                             "оцінка тоді виконується в одному процесі, у грі F3 показує панель")
+    args = parser.parse_args()
+
+    if args.profile:
+        enable_profiling()
+    if args.evaluate:
+        processes = 0 if args.profile else args.processes
+        print_report(evaluate(args.levels, args.evaluate, args.seed, processes=processes,
+                              level_file=args.level, vectorized=args.vectorized))
+    else:
+        main(args.level)
+    if args.profile:
+        profiler.dump(args.profile)
+        for key, value in profiler.summary().items():
+            print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
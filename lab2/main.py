@@ -1,175 +1,1730 @@
+import argparse
+import asyncio
+import csv
+import gc
+import hashlib
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import random
+import re
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+
+ONTOLOGY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ontology.tsv")
+
+# Назви зв'язків у файлах триплетів -> вид зв'язку бази знань
+TRIPLE_RELATIONS = {
+    "is_a": "is_a", "isA": "is_a", "subClassOf": "is_a", "type": "is_a",
+    "part_of": "part_of", "partOf": "part_of",
+    "eats": "eats",
+}
+
+# Бінарний знімок: заголовок (сигнатура, кількість розділів), таблиця розділів
+# (назва, зсув, довжина) і самі розділи, вирівняні на 8 байтів.
+# Останній байт сигнатури - порядок байтів машини, що записала знімок.
+SNAPSHOT_MAGIC = b"KBSNAP1" + (b"L" if sys.byteorder == "little" else b"B")
+SNAPSHOT_HEADER = struct.Struct("<8sI")
+SNAPSHOT_SECTION = struct.Struct("<32sqq")
+SNAPSHOT_RELATIONS = (
+    ("is_a", "is_a_relations"),
+    ("children", "is_a_children"),
+    ("part_of", "part_of_relations"),
+    ("eats", "eats_relations"),
+    ("ancestors", "ancestor_index"),
+    ("wholes", "whole_index"),
+)
+
+# Сервер запитів: скільки останніх затримок зберігати на кожен вид запиту
+LATENCY_SAMPLES = 10000
+
+# Бенчмарк: на скільки відносно базової лінії може зрости метрика, перш ніж це регресія
+BENCHMARK_TOLERANCE = 0.25
+# ... і менший абсолютний приріст (за суфіксом метрики) вважається шумом
+BENCHMARK_FLOORS = {"_s": 0.001, "_us": 1.0, "_mb": 0.1}
+# Скільки разів повторюється кожен вимір; у результат іде найкращий
+BENCHMARK_REPEATS = 5
+
+
+class ClosureCache:
+    """
+    Обмежений кеш замикань: entity -> кортеж вузлів замикання від найближчих.
+    При переповненні витісняється один запис за політикою policy:
+    "lru" - до якого найдовше не зверталися, "fifo" - найстаріший доданий.
+    Лічильники hits / misses / evictions / invalidations допомагають підібрати розмір.
+    """
+
+    POLICIES = ("lru", "fifo")
+
+    def __init__(self, maxsize=1024, policy="lru"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Невідома політика витіснення: '{policy}'")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, entity, compute):
+        """Замикання з кешу або compute(entity), яке одразу кешується"""
+        closure = self._entries.get(entity)
+        if closure is not None:
+            self.hits += 1
+            if self.policy == "lru":
+                self._entries.move_to_end(entity)
+            return closure
+        self.misses += 1
+        closure = self._entries[entity] = tuple(compute(entity))
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return closure
+
+    def peek(self, entity):
+        """Запис без оновлення черги та лічильників, або None"""
+        return self._entries.get(entity)
+
+    def discard(self, entity):
+        if self._entries.pop(entity, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# --- ПРАВИЛА ТА ПРЯМЕ ВИВЕДЕННЯ ---
+
+class Rule:
+    """
+    Декларативне правило head(x, z) <- first(x, y), second(y, z).
+    Атом - назва зв'язку; "~" на початку назви означає обернений зв'язок:
+    ~is_a(x, y) = is_a(y, x). Транзитивність, успадкування та композиція
+    зводяться до цієї форми (див. transitive, inherited, compose).
+    """
+
+    def __init__(self, head, first, second):
+        self.head = head
+        self.body = (_parse_atom(first), _parse_atom(second))
+
+    def __repr__(self):
+        first, second = ("~" * inverse + relation for relation, inverse in self.body)
+        return f"Rule({self.head}(x, z) <- {first}(x, y), {second}(y, z))"
+
+
+def _parse_atom(atom):
+    """'~name' -> ('name', True), 'name' -> ('name', False)"""
+    return (atom[1:], True) if atom.startswith("~") else (atom, False)
+
+
+def transitive(relation):
+    """relation(x, y), relation(y, z) -> relation(x, z)"""
+    return Rule(relation, relation, relation)
+
+
+def inherited(relation, via="is_a", side="object"):
+    """
+    Успадкування relation через ієрархію via.
+    side="subject": різновид суб'єкта має ті самі зв'язки (via(x, y), relation(y, z) -> relation(x, z));
+    side="object": зв'язок переходить на різновиди об'єкта (relation(x, y), via(z, y) -> relation(x, z)).
+    """
+    if side == "subject":
+        return Rule(relation, via, relation)
+    if side == "object":
+        return Rule(relation, relation, "~" + via)
+    raise ValueError(f"Невідомий бік успадкування: '{side}'")
+
+
+def compose(head, first, second):
+    """first(x, y), second(y, z) -> head(x, z)"""
+    return Rule(head, first, second)
+
+
+# Правила, що відповідають змісту check_related: ієрархія й частини транзитивні,
+# частини цілого має кожен його різновид, а харчування успадковують
+# різновиди хижака й поширюється на різновиди жертви.
+DEFAULT_RULES = (
+    transitive("is_a"),
+    transitive("part_of"),
+    inherited("part_of", side="object"),
+    inherited("eats", side="subject"),
+    inherited("eats", side="object"),
+)
+
+
+class RuleEngine:
+    """
+    Реєстр зв'язків і інкрементне пряме виведення (semi-naive).
+    Кожен зв'язок зберігається в обидва боки (суб'єкт -> об'єкти, об'єкт -> суб'єкти),
+    тож з'єднання в правилі - це пошук за ключем. Кожен раунд з'єднує з
+    повною базою лише факти, нові в попередньому раунді, тому кожен факт
+    обробляється один раз, а нові факти можна додавати будь-коли - виводиться
+    лише їхній наслідок.
+    """
+
+    def __init__(self, rules=()):
+        self.forward = {}
+        self.backward = {}
+        self.rules = []
+        self._triggers = {}
+        self.rounds = 0
+        self.derived = 0
+        for rule in rules:
+            self.add_rule(rule)
+
+    def register(self, relation):
+        """Реєструє зв'язок (повторна реєстрація нічого не змінює)"""
+        if relation not in self.forward:
+            self.forward[relation] = {}
+            self.backward[relation] = {}
+            self._triggers[relation] = []
+
+    def add_rule(self, rule):
+        """
+        Додає правило. Якщо факти вже є, наслідки нового правила
+        виводяться одразу з усіх фактів зв'язків його тіла.
+        """
+        self.register(rule.head)
+        for position, (relation, _) in enumerate(rule.body):
+            self.register(relation)
+            self._triggers[relation].append((rule, position))
+        self.rules.append(rule)
+        existing = [(relation, subject, obj) for relation, _ in rule.body
+                    for subject, obj in self.facts(relation)]
+        return self._saturate(existing)
+
+    def add_fact(self, relation, subject, obj):
+        """Додає факт і виводить його наслідки; повертає кількість нових фактів"""
+        return self.add_facts([(relation, subject, obj)])
+
+    def add_facts(self, facts):
+        """Додає факти (зв'язок, суб'єкт, об'єкт) одним пакетом; повертає кількість нових фактів"""
+        delta = []
+        for relation, subject, obj in facts:
+            if self._insert(relation, subject, obj):
+                delta.append((relation, subject, obj))
+        return len(delta) + self._saturate(delta)
+
+    def _insert(self, relation, subject, obj):
+        self.register(relation)
+        objects = self.forward[relation].setdefault(subject, set())
+        if obj in objects:
+            return False
+        objects.add(obj)
+        self.backward[relation].setdefault(obj, set()).add(subject)
+        return True
+
+    def _saturate(self, delta):
+        """Раунди semi-naive: з'єднує лише нові факти, доки з'являються нові"""
+        derived = 0
+        while delta:
+            self.rounds += 1
+            new = []
+            for relation, subject, obj in delta:
+                for rule, position in self._triggers.get(relation, ()):
+                    for fact in self._join(rule, position, subject, obj):
+                        if self._insert(*fact):
+                            new.append(fact)
+            derived += len(new)
+            delta = new
+        self.derived += derived
+        return derived
+
+    def _join(self, rule, position, subject, obj):
+        """Факти голови правила, які дає новий факт на місці position у тілі"""
+        (first, first_inverse), (second, second_inverse) = rule.body
+        if position == 0:
+            x, y = (obj, subject) if first_inverse else (subject, obj)
+            index = self.backward if second_inverse else self.forward
+            return [(rule.head, x, z) for z in tuple(index[second].get(y, ()))]
+        y, z = (obj, subject) if second_inverse else (subject, obj)
+        index = self.forward if first_inverse else self.backward
+        return [(rule.head, x, z) for x in tuple(index[first].get(y, ()))]
+
+    def holds(self, relation, subject, obj):
+        return obj in self.forward.get(relation, {}).get(subject, ())
+
+    def objects(self, relation, subject):
+        """Усі obj, для яких виведено relation(subject, obj)"""
+        return set(self.forward.get(relation, {}).get(subject, ()))
+
+    def subjects(self, relation, obj):
+        """Усі subject, для яких виведено relation(subject, obj)"""
+        return set(self.backward.get(relation, {}).get(obj, ()))
+
+    def facts(self, relation):
+        for subject, objects in self.forward.get(relation, {}).items():
+            for obj in objects:
+                yield subject, obj
+
+    def count(self, relation=None):
+        relations = [relation] if relation is not None else list(self.forward)
+        return sum(len(objects) for name in relations for objects in self.forward.get(name, {}).values())
+
+
 class KnowledgeBase:
-    def __init__(self):
+    def __init__(self, closure_index=False, cache_size=0, cache_policy="lru"):
         # Словники для зберігання прямих зв'язків
         self.is_a_relations = {}
         self.part_of_relations = {}
         self.eats_relations = {}
 
+        # Зворотні зв'язки (parent -> children, whole -> parts) для оновлення індексу
+        self.is_a_children = {}
+        self.part_of_parts = {}
+
+        # Індекс транзитивного замикання: entity -> множина всіх предків / цілих
+        self.ancestor_index = None
+        self.whole_index = None
+        if closure_index:
+            self.enable_closure_index()
+
+        # Кеш замикань для популярних сутностей (коли індексу немає): cache_size записів
+        self.ancestor_cache = None
+        self.whole_cache = None
+        if cache_size:
+            self.enable_closure_cache(cache_size, cache_policy)
+
+        # Рушій правил, який матеріалізує виведені факти (див. enable_rules)
+        self.rules = None
+
     def add_is_a(self, child, parent):
         """Додає факт: child Є parent"""
         if child not in self.is_a_relations:
             self.is_a_relations[child] = set()
         self.is_a_relations[child].add(parent)
+        self.is_a_children.setdefault(parent, set()).add(child)
+        if self.ancestor_index is not None:
+            self._propagate(self.ancestor_index, self.is_a_children, child, parent)
+        if self.ancestor_cache is not None:
+            self._invalidate(self.ancestor_cache, self.is_a_children, child, parent)
+        if self.rules is not None:
+            self.rules.add_fact("is_a", child, parent)
 
     def add_part_of(self, part, whole):
         """Додає факт: part Є ЧАСТИНОЮ whole"""
         if part not in self.part_of_relations:
             self.part_of_relations[part] = set()
         self.part_of_relations[part].add(whole)
+        self.part_of_parts.setdefault(whole, set()).add(part)
+        if self.whole_index is not None:
+            self._propagate(self.whole_index, self.part_of_parts, part, whole)
+        if self.whole_cache is not None:
+            self._invalidate(self.whole_cache, self.part_of_parts, part, whole)
+        if self.rules is not None:
+            self.rules.add_fact("part_of", part, whole)
 
     def add_eats(self, predator, prey):
-        """Додає факт: predator ЇСТЬ prey"""
+        """
+        Додає факт: predator ЇСТЬ prey.
+        Замикання is_a / part_of від eats не залежать, тож кеш не скидається.
+        """
         if predator not in self.eats_relations:
             self.eats_relations[predator] = set()
         self.eats_relations[predator].add(prey)
+        if self.rules is not None:
+            self.rules.add_fact("eats", predator, prey)
+
+    def add_triples(self, triples):
+        """
+        Масово додає триплети (суб'єкт, зв'язок, об'єкт) з будь-якого ітератора.
+        Увімкнений індекс замикання перебудовується один раз наприкінці,
+        а не після кожного факту. Повертає кількість доданих триплетів.
+        """
+        indexed = self.ancestor_index is not None
+        self.ancestor_index = self.whole_index = None
+        relations = {
+            "is_a": (self.is_a_relations, self.is_a_children),
+            "part_of": (self.part_of_relations, self.part_of_parts),
+            "eats": (self.eats_relations, None),
+        }
+        count = 0
+        added = [] if self.rules is not None else None
+        try:
+            for subject, relation, obj in triples:
+                try:
+                    forward, reverse = relations[relation]
+                except KeyError:
+                    raise ValueError(f"Невідомий зв'язок '{relation}'") from None
+                forward.setdefault(subject, set()).add(obj)
+                if reverse is not None:
+                    reverse.setdefault(obj, set()).add(subject)
+                if added is not None:
+                    added.append((relation, subject, obj))
+                count += 1
+        finally:
+            if added:
+                self.rules.add_facts(added)
+            if indexed:
+                self.enable_closure_index()
+            for cache in (self.ancestor_cache, self.whole_cache):
+                if cache is not None:
+                    cache.clear()
+        return count
+
+    def load_triples(self, filename, fmt=None):
+        """Потоково завантажує факти з файлу TSV, CSV або N-Triples (див. iter_triples)"""
+        return self.add_triples(iter_triples(filename, fmt))
+
+    def iter_facts(self):
+        """Усі прямі факти як трійки (зв'язок, суб'єкт, об'єкт)"""
+        for relation, facts in (("is_a", self.is_a_relations),
+                                ("part_of", self.part_of_relations),
+                                ("eats", self.eats_relations)):
+            for subject, objects in facts.items():
+                for obj in objects:
+                    yield relation, subject, obj
+
+    def enable_rules(self, rules=DEFAULT_RULES):
+        """
+        Підключає RuleEngine з правилами rules і матеріалізує всі виведені
+        факти. Далі кожен add_* додає до рушія лише новий факт та його наслідки.
+        Повертає рушій, у якому можна реєструвати нові зв'язки й правила.
+        """
+        self.rules = RuleEngine(rules)
+        self.rules.add_facts(self.iter_facts())
+        return self.rules
+
+    # --- ІНДЕКС ЗАМИКАННЯ ---
+
+    def enable_closure_index(self):
+        """
+        Будує індекс транзитивного замикання для is_a та part_of і далі
+        підтримує його інкрементно при кожному add_is_a / add_part_of.
+        Після цього пошук предків і перевірка "A is_a B" виконуються за O(1).
+        """
+        self.ancestor_index = self._closure_table(self.is_a_relations)
+        self.whole_index = self._closure_table(self.part_of_relations)
+
+    @staticmethod
+    def _closure_table(forward):
+        """
+        Будує замикання forward (вузол -> прямі батьки) за O(сума розмірів
+        замикань): closure(x) = об'єднання closure(p) | {p} по батьках p.
+        Компоненти сильної зв'язності (Тар'ян, зі стеком замість рекурсії)
+        завершуються у зворотному топологічному порядку, тож замикання
+        батьків уже готові. Вузли одного циклу мають спільне замикання,
+        що містить і їх самих - так само, як після _propagate.
+        """
+        order, lowlink, closures = {}, {}, {}
+        stack, on_stack = [], set()
+        for root in forward:
+            if root in order:
+                continue
+            order[root] = lowlink[root] = len(order)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(forward[root]))]
+            while work:
+                node, parents = work[-1]
+                for parent in parents:
+                    if parent not in order:
+                        order[parent] = lowlink[parent] = len(order)
+                        stack.append(parent)
+                        on_stack.add(parent)
+                        work.append((parent, iter(forward.get(parent, ()))))
+                        break
+                    if parent in on_stack:
+                        lowlink[node] = min(lowlink[node], order[parent])
+                else:
+                    work.pop()
+                    if work:
+                        above = work[-1][0]
+                        lowlink[above] = min(lowlink[above], lowlink[node])
+                    if lowlink[node] != order[node]:
+                        continue
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    members = set(component)
+                    closure = set()
+                    for member in component:
+                        for parent in forward.get(member, ()):
+                            if parent not in members:
+                                closure |= closures[parent]
+                                closure.add(parent)
+                    if len(component) > 1 or node in forward.get(node, ()):
+                        closure |= members
+                    for member in component:
+                        closures[member] = closure if member == node else set(closure)
+        return {node: closures[node] for node, parents in forward.items() if parents}
+
+    @staticmethod
+    def _propagate(index, reverse, child, parent):
+        """
+        Додає до замикання ребро child -> parent: предки parent (разом із ним)
+        стають предками child і всіх його нащадків. Обхід зупиняється на
+        вузлах, які вже містять усі нові предки, бо тоді їх мають і їхні нащадки.
+        """
+        new = index.get(parent, set()) | {parent}
+        stack = [child]
+        while stack:
+            node = stack.pop()
+            known = index.setdefault(node, set())
+            if new <= known:
+                continue
+            known |= new
+            stack.extend(reverse.get(node, ()))
+
+    # --- КЕШ ЗАМИКАНЬ ---
+
+    def enable_closure_cache(self, size=1024, policy="lru"):
+        """Вмикає (або замінює порожніми) кеші замикань предків і цілих на size записів"""
+        self.ancestor_cache = ClosureCache(size, policy)
+        self.whole_cache = ClosureCache(size, policy)
+
+    @staticmethod
+    def _invalidate(cache, reverse, child, parent):
+        """
+        Викидає з кешу замикання, які змінило нове ребро child -> parent:
+        замикання child і його нащадків. Гілка далі не обходиться, якщо в
+        закешованому замиканні вузла parent уже є - тоді в ньому вже є й
+        усі предки parent, і ні вузол, ні його нащадки не змінюються.
+        """
+        stack, seen = [child], {child}
+        while stack:
+            node = stack.pop()
+            closure = cache.peek(node)
+            if closure is not None:
+                if parent in closure:
+                    continue
+                cache.discard(node)
+            for descendant in reverse.get(node, ()):
+                if descendant not in seen:
+                    seen.add(descendant)
+                    stack.append(descendant)
+
+    def cache_stats(self):
+        """Лічильники кешів замикань (None, якщо кеш вимкнено)"""
+        return {
+            "ancestors": self.ancestor_cache.stats() if self.ancestor_cache is not None else None,
+            "wholes": self.whole_cache.stats() if self.whole_cache is not None else None,
+        }
+
+    def is_a(self, entity, ancestor):
+        """Чи є entity (транзитивно) різновидом ancestor"""
+        if self.ancestor_index is not None:
+            return ancestor in self.ancestor_index.get(entity, ())
+        if self.ancestor_cache is not None:
+            return ancestor in self._cached_ancestors(entity)
+        return ancestor in self.get_all_parents(entity)
 
     # --- ПРАВИЛА ВИВЕДЕННЯ ---
 
-    def get_all_parents(self, entity, visited=None):
+    @staticmethod
+    def _iter_closure(relations, start, visited=None):
         """
-        Рекурсивно знаходить усіх предків сутності через зв'язок is_a.
+        Ітеративний обхід у ширину по зв'язках relations від start. Одна спільна
+        множина visited замість нових множин на кожному рівні, тому глибина
+        ієрархії не обмежена стеком викликів. Найближчі вузли видаються першими.
         """
         if visited is None:
             visited = set()
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for neighbour in relations.get(node, ()):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    yield neighbour
+                    queue.append(neighbour)
+
+    def _cached_ancestors(self, entity):
+        return self.ancestor_cache.get(entity, lambda node: self._iter_closure(self.is_a_relations, node))
 
-        parents = self.is_a_relations.get(entity, set())
-        all_parents = set(parents)
+    def _cached_wholes(self, part):
+        return self.whole_cache.get(part, lambda node: self._iter_closure(self.part_of_relations, node))
 
-        for parent in parents:
-            if parent not in visited:
-                visited.add(parent)
-                all_parents.update(self.get_all_parents(parent, visited))
+    def iter_ancestors(self, entity):
+        """Ліниво перебирає всіх предків сутності (is_a), від найближчих"""
+        if self.ancestor_index is not None:
+            return iter(self.ancestor_index.get(entity, ()))
+        if self.ancestor_cache is not None:
+            return iter(self._cached_ancestors(entity))
+        return self._iter_closure(self.is_a_relations, entity)
 
-        return all_parents
+    def iter_wholes(self, part):
+        """Ліниво перебирає всі об'єкти, частиною яких є part, від найближчих"""
+        if self.whole_index is not None:
+            return iter(self.whole_index.get(part, ()))
+        if self.whole_cache is not None:
+            return iter(self._cached_wholes(part))
+        return self._iter_closure(self.part_of_relations, part)
+
+    def get_all_parents(self, entity, visited=None):
+        """
+        Знаходить усіх предків сутності через зв'язок is_a.
+        visited - необов'язкова множина вузлів, які вже не потрібно обходити.
+        """
+        if self.ancestor_index is not None:
+            return set(self.ancestor_index.get(entity, ()))
+        if self.ancestor_cache is not None and visited is None:
+            return set(self._cached_ancestors(entity))
+        return set(self._iter_closure(self.is_a_relations, entity, visited))
 
     def get_all_wholes(self, part, visited=None):
         """
-        Рекурсивно знаходить усі об'єкти, частиною яких є part.
+        Знаходить усі об'єкти, частиною яких є part.
+        visited - необов'язкова множина вузлів, які вже не потрібно обходити.
         """
-        if visited is None:
-            visited = set()
+        if self.whole_index is not None:
+            return set(self.whole_index.get(part, ()))
+        if self.whole_cache is not None and visited is None:
+            return set(self._cached_wholes(part))
+        return set(self._iter_closure(self.part_of_relations, part, visited))
 
-        wholes = self.part_of_relations.get(part, set())
-        all_wholes = set(wholes)
+    def _ancestor_search(self, entity, ancestor):
+        """
+        Двонаправлений BFS: фронт від entity йде вгору по is_a, фронт від
+        ancestor - вниз по зворотних зв'язках. Щоразу розширюється менший
+        фронт; пошук завершується при першій зустрічі або коли фронт порожніє.
+        Генератор віддає керування після кожного кроку, щоб кілька пошуків
+        можна було вести по черзі; результат повертається через return.
+        """
+        forward = set(self.is_a_relations.get(entity, ()))
+        if ancestor in forward:
+            return True
+        backward = {ancestor}
+        seen_forward, seen_backward = set(forward), set(backward)
+        while forward and backward:
+            yield
+            if len(forward) <= len(backward):
+                forward = {parent for node in forward for parent in self.is_a_relations.get(node, ())
+                           if parent not in seen_forward}
+                if not forward.isdisjoint(seen_backward):
+                    return True
+                seen_forward |= forward
+            else:
+                backward = {child for node in backward for child in self.is_a_children.get(node, ())
+                            if child not in seen_backward}
+                if not backward.isdisjoint(seen_forward):
+                    return True
+                seen_backward |= backward
+        return False
 
-        for whole in wholes:
-            if whole not in visited:
-                visited.add(whole)
-                all_wholes.update(self.get_all_wholes(whole, visited))
+    @staticmethod
+    def _any_search(searches):
+        """Веде пошуки-генератори по черзі; True, щойно будь-який з них знайде зв'язок"""
+        searches = list(searches)
+        while searches:
+            for search in list(searches):
+                try:
+                    next(search)
+                except StopIteration as stop:
+                    if stop.value:
+                        return True
+                    searches.remove(search)
+        return False
 
-        return all_wholes
+    def _iter_preys(self, predators):
+        """Для кожного хижака з потоку predators видає пари (жертва, хижак)"""
+        for predator in predators:
+            for prey in self.eats_relations.get(predator, ()):
+                yield prey, predator
+
+    @staticmethod
+    def _meet(left, right):
+        """
+        Зустрічний пошук: по черзі бере вузли з двох лінивих обходів і
+        зупиняється на першому спільному. Елементи left - пари (вузол, мітка),
+        повертається мітка вузла зустрічі або None, якщо спільних вузлів немає.
+        """
+        seen_left, seen_right = {}, set()
+        left_done = right_done = False
+        while not (left_done and right_done):
+            if not left_done:
+                item = next(left, None)
+                if item is None:
+                    left_done = True
+                elif item[0] in seen_right:
+                    return item[1]
+                else:
+                    seen_left.setdefault(item[0], item[1])
+            if not right_done:
+                node = next(right, None)
+                if node is None:
+                    right_done = True
+                elif node in seen_left:
+                    return seen_left[node]
+                else:
+                    seen_right.add(node)
+            # Якщо один бік вичерпано, а інший ще нічого не знайшов - другий бік більше не потрібен
+            if (left_done and not seen_left) or (right_done and not seen_right):
+                return None
+        return None
+
+    def _reaches(self, left, right):
+        return self._meet(((node, node) for node in left), right) is not None
 
     def check_related(self, entity_a, entity_b):
         """
         Головна функція запиту: чи пов'язані A і B?
         Перевіряє is_a, part_of та їх комбінації.
+        Кожне правило перевіряється зустрічним пошуком від обох сутностей,
+        який зупиняється на першому вузлі зустрічі, тож вартість запиту
+        залежить від довжини шляху, а не від розміру онтології.
         """
-        # 1. Отримуємо всі транзитивні зв'язки для обох сутностей
-        parents_a = self.get_all_parents(entity_a)
-        parents_b = self.get_all_parents(entity_b)
-        wholes_a = self.get_all_wholes(entity_a)
-        wholes_b = self.get_all_wholes(entity_b)
+        return self._explain(entity_a, entity_b, self._relate(entity_a, entity_b))
+
+    def _relate(self, entity_a, entity_b):
+        """Повертає знайдене правило як пару (правило, хижак) або None"""
+        def with_ancestors(entity):
+            return itertools.chain([entity], self.iter_ancestors(entity))
 
         # --- ПЕРЕВІРКА ЗВ'ЯЗКІВ ---
 
         # А) Пряма ієрархія (A is_a B або B is_a A)
-        if entity_b in parents_a or entity_a in parents_b:
-            return True, "Зв'язок через ієрархію (IS_A)"
+        if self.ancestor_index is not None or self.ancestor_cache is not None:
+            hierarchy = self.is_a(entity_a, entity_b) or self.is_a(entity_b, entity_a)
+        else:
+            # Обидва напрямки шукаються по черзі, щоб безуспішний не затримував вдалий
+            hierarchy = self._any_search([self._ancestor_search(entity_a, entity_b),
+                                          self._ancestor_search(entity_b, entity_a)])
+        if hierarchy:
+            return "is_a", None
 
         # Б) Частина-ціле (A part_of B або B part_of A)
         # Перевірка: Чи є A частиною B (або його предків)?
-        b_and_ancestors = parents_b | {entity_b}
-        if not wholes_a.isdisjoint(b_and_ancestors):
-            return True, f"'{entity_a}' є компонентом '{entity_b}' (або його предка)"
+        if self._reaches(self.iter_wholes(entity_a), with_ancestors(entity_b)):
+            return "part_of", None
 
         # Перевірка у зворотний бік: Чи є B частиною A?
-        a_and_ancestors = parents_a | {entity_a}
-        if not wholes_b.isdisjoint(a_and_ancestors):
-            return True, f"'{entity_b}' є компонентом '{entity_a}' (або його предка)"
+        if self._reaches(self.iter_wholes(entity_b), with_ancestors(entity_a)):
+            return "has_part", None
 
         # В) Харчовий ланцюжок (EATS)
-        # Перевіряємо, чи їсть хтось із предків A когось із предків B
-        for predator in (parents_a | {entity_a}):
-            preys = self.eats_relations.get(predator, set())
-            # Чи є серед жертв цього хижака сама сутність B або її предки?
-            if not preys.isdisjoint(parents_b | {entity_b}):
-                return True, f"Зв'язок через харчування ('{predator}' їсть)"
+        # Жертви A та його предків зустрічаються з B або його предками
+        predator = self._meet(self._iter_preys(with_ancestors(entity_a)), with_ancestors(entity_b))
+        if predator is not None:
+            return "eats", predator
 
-        return False, "Зв'язку не знайдено"
+        return None
 
+    @staticmethod
+    def _explain(entity_a, entity_b, relation):
+        """Перетворює знайдене правило на відповідь (результат, причина)"""
+        if relation is None:
+            return False, "Зв'язку не знайдено"
+        rule, predator = relation
+        if rule == "is_a":
+            return True, "Зв'язок через ієрархію (IS_A)"
+        if rule == "part_of":
+            return True, f"'{entity_a}' є компонентом '{entity_b}' (або його предка)"
+        if rule == "has_part":
+            return True, f"'{entity_b}' є компонентом '{entity_a}' (або його предка)"
+        return True, f"Зв'язок через харчування ('{predator}' їсть)"
 
-# =========================================
-# ЗАПОВНЕННЯ БАЗИ ЗНАНЬ (ОНТОЛОГІЯ)
-# =========================================
-kb = KnowledgeBase()
+    # --- ПАКЕТНІ ЗАПИТИ ---
+
+    def _closures(self, entities):
+        """
+        Для кожної різної сутності один раз рахує її замикання:
+        (сутність і предки від найближчих, множина предків, множина цілих).
+        """
+        closures = {}
+        for entity in entities:
+            if entity not in closures:
+                ancestors = list(self.iter_ancestors(entity))
+                closures[entity] = ([entity] + ancestors, set(ancestors), self.get_all_wholes(entity))
+        return closures
+
+    def _relate_closed(self, entity_a, entity_b, closures):
+        """Ті самі правила, що й у _relate, але над готовими замиканнями"""
+        lineage_a, ancestors_a, wholes_a = closures[entity_a]
+        _, ancestors_b, wholes_b = closures[entity_b]
+
+        # А) Пряма ієрархія
+        if entity_b in ancestors_a or entity_a in ancestors_b:
+            return "is_a", None
+
+        # Б) Частина-ціле в обидва боки
+        if entity_b in wholes_a or not wholes_a.isdisjoint(ancestors_b):
+            return "part_of", None
+        if entity_a in wholes_b or not wholes_b.isdisjoint(ancestors_a):
+            return "has_part", None
+
+        # В) Харчовий ланцюжок: найближчий до A хижак, чия жертва - B або його предок
+        for predator in lineage_a:
+            preys = self.eats_relations.get(predator)
+            if preys and (entity_b in preys or not ancestors_b.isdisjoint(preys)):
+                return "eats", predator
+
+        return None
+
+    def _relate_pairs(self, pairs):
+        closures = self._closures(entity for pair in pairs for entity in pair)
+        return [self._relate_closed(entity_a, entity_b, closures) for entity_a, entity_b in pairs]
+
+    def _worker_source(self):
+        """Що отримують робочі процеси в _init_worker: сама база (копія через pickle)"""
+        return self
+
+    def worker_pool(self, processes=None):
+        """
+        Пул процесів, у кожному з яких уже є ця база, для повторних викликів
+        check_related_many(..., pool=pool). Процеси отримують стан бази на
+        момент створення пулу; закривати пул - справа того, хто його створив.
+        """
+        return multiprocessing.Pool(processes, initializer=_init_worker, initargs=(self._worker_source(),))
+
+    def _relate_many(self, pairs, processes, chunk_size, pool=None):
+        """Знаходить правила для всіх пар, за потреби ділячи пакет між процесами"""
+        if (pool is None and processes == 0) or len(pairs) <= chunk_size:
+            return self._relate_pairs(pairs)
+
+        # Пари з однаковою першою сутністю потрапляють в один шматок,
+        # щоб її замикання не рахувалося в кількох процесах
+        order = sorted(range(len(pairs)), key=lambda i: hash(pairs[i][0]))
+        shards = [[pairs[i] for i in order[start:start + chunk_size]]
+                  for start in range(0, len(order), chunk_size)]
+        if pool is not None:
+            shard_results = pool.map(_relate_shard, shards)
+        else:
+            with self.worker_pool(processes) as pool:
+                shard_results = pool.map(_relate_shard, shards)
+
+        results = [None] * len(pairs)
+        flat = (result for shard in shard_results for result in shard)
+        for index, result in zip(order, flat):
+            results[index] = result
+        return results
+
+    def check_related_many(self, pairs, processes=0, chunk_size=5000, pool=None):
+        """
+        Пакетна версія check_related: повертає список (результат, причина)
+        у порядку pairs. Замикання кожної сутності рахується один раз на пакет.
+        processes - кількість процесів для великих пакетів (None - усі ядра,
+        0 - у поточному процесі); кожен процес отримує шматки по chunk_size пар.
+        pool - готовий worker_pool(), який використовується замість нового.
+        """
+        pairs = list(pairs)
+        relations = self._relate_many(pairs, processes, chunk_size, pool)
+        return [self._explain(entity_a, entity_b, relation)
+                for (entity_a, entity_b), relation in zip(pairs, relations)]
+
+    # --- КОМПАКТНА ФОРМА ---
 
-# --- 1. Ієрархія (is_a) ---
-# Рівень 1
-kb.add_is_a("animal", "organism")
-kb.add_is_a("plant", "organism")
+    def freeze(self):
+        """Повертає незмінну компактну копію бази для запитів (FrozenKnowledgeBase)"""
+        return FrozenKnowledgeBase.from_knowledge_base(self)
 
-# Рівень 2
-kb.add_is_a("mammal", "animal")
-kb.add_is_a("bird", "animal")
-kb.add_is_a("tree", "plant")
 
-# Рівень 3
-kb.add_is_a("canine", "mammal")
-kb.add_is_a("feline", "mammal")
+class EntityTable:
+    """Інтернування сутностей: рядок <-> ціле число (номер у порядку появи)"""
 
-# Рівень 4 (Практичні класи)
-kb.add_is_a("dog", "canine")
-kb.add_is_a("cat", "feline")
-kb.add_is_a("oak", "tree")
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        for name in names:
+            self.intern(name)
 
-# Екземпляри (Реалізації)
-kb.add_is_a("rex", "dog")
-kb.add_is_a("buddy", "dog")
-kb.add_is_a("barsik", "cat")
-kb.add_is_a("old_oak", "oak")
+    @classmethod
+    def from_names(cls, names):
+        """Таблиця з уже унікальних назв, номер - позиція в списку"""
+        table = cls()
+        table.names = list(names)
+        table.ids = dict(zip(table.names, range(len(table.names))))
+        return table
 
-# --- 2. Частини (part_of) ---
-kb.add_part_of("head", "animal")
-kb.add_part_of("tail", "mammal")
-kb.add_part_of("skin", "mammal")
-kb.add_part_of("fur", "skin")
-kb.add_part_of("leaf", "tree")
+    def __len__(self):
+        return len(self.names)
 
-# --- 3. Інше (eats) ---
-kb.add_eats("canine", "animal")
-kb.add_eats("feline", "bird")
+    def intern(self, name):
+        entity_id = self.ids.get(name)
+        if entity_id is None:
+            entity_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return entity_id
+
+    def id_of(self, name):
+        """Номер сутності або -1, якщо такої сутності немає"""
+        return self.ids.get(name, -1)
+
+
+class Adjacency:
+    """
+    Незмінні списки суміжності у форматі CSR: сусіди вузла i - це
+    targets[offsets[i]:offsets[i + 1]], відсортовані за зростанням.
+    Рядки віддаються як memoryview без копіювання.
+    """
+
+    def __init__(self, offsets, targets):
+        self.offsets = offsets
+        self.targets = targets
+        self.size = len(offsets) - 1
+        self._view = memoryview(targets)
+
+    def __reduce__(self):
+        return type(self), (array("q", memoryview(self.offsets).tobytes()), array("i", self._view.tobytes()))
+
+    @classmethod
+    def from_relations(cls, relations, entities):
+        """Будує CSR зі словника множин, переводячи сутності в номери entities"""
+        rows = [()] * len(entities)
+        for source, targets in relations.items():
+            rows[entities.ids[source]] = sorted(entities.ids[target] for target in targets)
+        offsets, targets = array("q", [0]), array("i")
+        for row in rows:
+            targets.extend(row)
+            offsets.append(len(targets))
+        return cls(offsets, targets)
+
+    def get(self, node, default=()):
+        if 0 <= node < self.size:
+            return self._view[self.offsets[node]:self.offsets[node + 1]]
+        return default
+
+    def has(self, node, target):
+        """Чи є target серед сусідів node (двійковий пошук у рядку)"""
+        row = self.get(node)
+        position = bisect_left(row, target)
+        return position < len(row) and row[position] == target
+
+
+class _FrozenCore(KnowledgeBase):
+    """
+    Ті самі алгоритми KnowledgeBase, але над номерами сутностей і масивами
+    Adjacency замість словників множин. Лише для запитів.
+    """
+
+    def __init__(self, is_a_relations, is_a_children, part_of_relations, eats_relations,
+                 ancestor_index=None, whole_index=None, snapshot=None):
+        self.is_a_relations = is_a_relations
+        self.is_a_children = is_a_children
+        self.part_of_relations = part_of_relations
+        self.part_of_parts = None
+        self.eats_relations = eats_relations
+        self.ancestor_index = ancestor_index
+        self.whole_index = whole_index
+        self.ancestor_cache = None
+        self.whole_cache = None
+        self.rules = None
+        # Файл знімка з тим самим вмістом: робочі процеси відкривають його самі
+        self.snapshot = snapshot
+
+    def _worker_source(self):
+        return self.snapshot if self.snapshot is not None else self
+
+    def is_a(self, entity, ancestor):
+        if self.ancestor_index is not None:
+            return self.ancestor_index.has(entity, ancestor)
+        return super().is_a(entity, ancestor)
+
+
+class FrozenKnowledgeBase:
+    """
+    Компактна незмінна форма KnowledgeBase, яку повертає freeze().
+    Сутності інтерновано в цілі числа (EntityTable), а зв'язки й індекси
+    замикання зберігаються масивами CSR (Adjacency), тому немає накладних
+    витрат на окремі рядки й множини. Методи запитів ті самі, що й у
+    KnowledgeBase, і приймають та повертають назви сутностей.
+    """
+
+    def __init__(self, entities, core):
+        self.entities = entities
+        self._core = core
+
+    @classmethod
+    def from_knowledge_base(cls, kb):
+        entities = EntityTable()
+        for relations in (kb.is_a_relations, kb.part_of_relations, kb.eats_relations):
+            for source, targets in relations.items():
+                entities.intern(source)
+                for target in targets:
+                    entities.intern(target)
+
+        def compact(relations):
+            if relations is None:
+                return None
+            return Adjacency.from_relations(relations, entities)
+
+        core = _FrozenCore(compact(kb.is_a_relations), compact(kb.is_a_children),
+                           compact(kb.part_of_relations), compact(kb.eats_relations),
+                           compact(kb.ancestor_index), compact(kb.whole_index))
+        return cls(entities, core)
+
+    def save(self, filename):
+        """
+        Записує базу в бінарний знімок (формат описано біля SNAPSHOT_MAGIC):
+        назви сутностей, масиви зв'язків і, якщо є, індекси замикання.
+        Файл спершу пишеться поруч і лише потім підміняє старий.
+        """
+        sections = [("names", "\0".join(self.entities.names).encode("utf-8"))]
+        for key, attribute in SNAPSHOT_RELATIONS:
+            adjacency = getattr(self._core, attribute)
+            if adjacency is not None:
+                sections.append((f"{key}/offsets", adjacency.offsets))
+                sections.append((f"{key}/targets", adjacency.targets))
+
+        table, offset = [], _align(SNAPSHOT_HEADER.size + SNAPSHOT_SECTION.size * len(sections))
+        for name, data in sections:
+            size = memoryview(data).nbytes
+            table.append((name, offset, size))
+            offset = _align(offset + size)
+
+        temporary = f"{filename}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(sections)))
+            for name, offset, size in table:
+                f.write(SNAPSHOT_SECTION.pack(name.encode(), offset, size))
+            for (name, offset, size), (_, data) in zip(table, sections):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(data)
+        os.replace(temporary, filename)
+        self._core.snapshot = filename
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Відкриває знімок, записаний save(), через mmap лише для читання.
+        Масиви зв'язків не копіюються і не розбираються, а читаються прямо з
+        відображеної пам'яті, тому процеси, що відкрили той самий знімок,
+        ділять одні й ті самі сторінки (зокрема робочі процеси
+        check_related_many, які відкривають той самий файл). Розбираються лише
+        назви сутностей. Пошкоджений чи обрізаний знімок дає ValueError.
+        """
+        with open(filename, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < SNAPSHOT_HEADER.size:
+            raise ValueError(f"{filename}: знімок обрізано")
+        magic, count = SNAPSHOT_HEADER.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{filename}: не знімок бази знань або інший порядок байтів")
+        if SNAPSHOT_HEADER.size + count * SNAPSHOT_SECTION.size > len(buffer):
+            raise ValueError(f"{filename}: знімок обрізано")
+
+        view = memoryview(buffer)
+        sections = {}
+        for i in range(count):
+            name, offset, size = SNAPSHOT_SECTION.unpack_from(buffer, SNAPSHOT_HEADER.size + i * SNAPSHOT_SECTION.size)
+            name = name.rstrip(b"\0").decode()
+            if offset < 0 or size < 0 or offset + size > len(buffer):
+                raise ValueError(f"{filename}: розділ '{name}' виходить за межі файлу")
+            sections[name] = view[offset:offset + size]
+        if "names" not in sections:
+            raise ValueError(f"{filename}: немає розділу 'names'")
+
+        names = str(sections["names"], "utf-8")
+        entities = EntityTable.from_names(names.split("\0") if names else [])
+        relations = {}
+        for key, attribute in SNAPSHOT_RELATIONS:
+            offsets, targets = sections.get(f"{key}/offsets"), sections.get(f"{key}/targets")
+            if offsets is None and targets is None:
+                continue
+            if offsets is None or targets is None:
+                raise ValueError(f"{filename}: розділ '{key}' неповний")
+            if offsets.nbytes % 8 or targets.nbytes % 4:
+                raise ValueError(f"{filename}: розмір розділу '{key}' не кратний розміру елемента")
+            offsets, targets = offsets.cast("q"), targets.cast("i")
+            if len(offsets) != len(entities) + 1 or offsets[0] != 0 or offsets[-1] != len(targets):
+                raise ValueError(f"{filename}: розділ '{key}' не відповідає таблиці сутностей")
+            relations[attribute] = Adjacency(offsets, targets)
+        return cls(entities, _FrozenCore(**relations, snapshot=filename))
+
+    def _names(self, ids):
+        names = self.entities.names
+        return (names[entity_id] for entity_id in ids)
+
+    def _explain(self, entity_a, entity_b, relation):
+        if relation is not None and relation[1] is not None:
+            relation = relation[0], self.entities.names[relation[1]]
+        return KnowledgeBase._explain(entity_a, entity_b, relation)
+
+    def is_a(self, entity, ancestor):
+        return self._core.is_a(self.entities.id_of(entity), self.entities.id_of(ancestor))
+
+    def iter_ancestors(self, entity):
+        return self._names(self._core.iter_ancestors(self.entities.id_of(entity)))
+
+    def iter_wholes(self, part):
+        return self._names(self._core.iter_wholes(self.entities.id_of(part)))
+
+    def get_all_parents(self, entity):
+        return set(self.iter_ancestors(entity))
+
+    def get_all_wholes(self, part):
+        return set(self.iter_wholes(part))
+
+    def check_related(self, entity_a, entity_b):
+        id_of = self.entities.id_of
+        return self._explain(entity_a, entity_b, self._core._relate(id_of(entity_a), id_of(entity_b)))
+
+    def worker_pool(self, processes=None):
+        return self._core.worker_pool(processes)
+
+    def check_related_many(self, pairs, processes=0, chunk_size=5000, pool=None):
+        pairs = list(pairs)
+        id_of = self.entities.id_of
+        id_pairs = [(id_of(entity_a), id_of(entity_b)) for entity_a, entity_b in pairs]
+        relations = self._core._relate_many(id_pairs, processes, chunk_size, pool)
+        return [self._explain(entity_a, entity_b, relation)
+                for (entity_a, entity_b), relation in zip(pairs, relations)]
+
+
+# --- Завантаження онтології ---
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+_NTRIPLE_TERM = re.compile(r'<([^>]*)>|"((?:[^"\\]|\\.)*)"(?:@[\w-]+|\^\^<[^>]*>)?|(_:\S+)')
+
+
+def _parse_ntriple(line):
+    """Розбирає рядок N-Triples на терми; від IRI лишається локальна назва"""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return []
+    terms = []
+    for match in _NTRIPLE_TERM.finditer(line):
+        iri, literal, blank = match.groups()
+        if iri is not None:
+            terms.append(iri[max(iri.rfind("/"), iri.rfind("#")) + 1:])
+        else:
+            terms.append(literal if literal is not None else blank)
+    return terms
+
+
+def iter_triples(filename, fmt=None):
+    """
+    Потоково читає факти (суб'єкт, зв'язок, об'єкт) з TSV, CSV або
+    N-Triples (fmt: "tsv", "csv", "nt"; за замовчуванням - за розширенням).
+    Файл читається буферизовано, рядок за рядком, тому розмір файлу не
+    обмежений пам'яттю. Порожні рядки й коментарі (#) пропускаються,
+    назви зв'язків зводяться до is_a / part_of / eats (TRIPLE_RELATIONS).
+    """
+    fmt = (fmt or os.path.splitext(filename)[1].lstrip(".")).lower()
+    with open(filename, encoding="utf-8", newline="") as f:
+        if fmt == "tsv":
+            rows = (line.rstrip("\r\n").split("\t") for line in f)
+        elif fmt == "csv":
+            rows = csv.reader(f)
+        elif fmt == "nt":
+            rows = (_parse_ntriple(line) for line in f)
+        else:
+            raise ValueError(f"Невідомий формат триплетів: '{fmt}'")
+
+        for line_number, row in enumerate(rows, 1):
+            if not row or not row[0] or row[0].startswith("#"):
+                continue
+            if len(row) != 3:
+                raise ValueError(f"{filename}:{line_number}: очікується 3 поля, отримано {len(row)}")
+            subject, relation, obj = row
+            kind = TRIPLE_RELATIONS.get(relation)
+            if kind is None:
+                raise ValueError(f"{filename}:{line_number}: невідомий зв'язок '{relation}'")
+            yield subject, kind, obj
+
+
+def load_ontology(filename=ONTOLOGY_FILE, closure_index=True):
+    """
+    Повертає заморожену базу знань із файлу триплетів. Знімок (разом з
+    індексами замикання) зберігається поруч у __pycache__ під хешем вмісту
+    файлу, тому повторні запуски лише відкривають його через mmap, а зміна
+    файлу створює новий знімок.
+    """
+    digest = hashlib.sha1(SNAPSHOT_MAGIC + (b"+index" if closure_index else b""))
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    directory, name = os.path.split(os.path.abspath(filename))
+    snapshot = os.path.join(directory, "__pycache__", f"{os.path.splitext(name)[0]}.{digest.hexdigest()[:16]}.kbsnap")
+    try:
+        return FrozenKnowledgeBase.load(snapshot)
+    except (OSError, ValueError, KeyError, struct.error):
+        pass
+
+    kb = KnowledgeBase(closure_index=closure_index)
+    kb.load_triples(filename)
+    frozen = kb.freeze()
+    try:
+        os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+        frozen.save(snapshot)
+    except OSError:
+        print(f"Попередження: Не вдалося зберегти знімок бази знань {snapshot}")
+    return frozen
+
+
+# --- Сервер запитів ---
+
+class QueryError(Exception):
+    """Помилка, яку сервер повернув у відповідь на запит"""
+
+
+class QueryServer:
+    """
+    Асинхронний сервер запитів до бази знань через TCP або Unix-сокет.
+    Протокол - JSON-рядки: {"id": 1, "op": "check_related", "a": "dog", "b": "fur"},
+    відповідь - {"id": 1, "result": ...} або {"id": 1, "error": "..."}.
+    Запити з одного з'єднання обробляються одночасно, тож відповіді можуть
+    приходити не в порядку запитів і зіставляються за id.
+
+    Запити check_related, що надійшли впродовж batch_window секунд, виконуються
+    одним пакетом check_related_many. Усі звернення до бази йдуть через один
+    робочий потік: цикл подій тим часом приймає нові запити, а база (зокрема
+    змінна, з кешами) ніколи не використовується з двох потоків одночасно.
+    """
+
+    OPERATIONS = ("check_related", "ancestors", "wholes", "is_a", "stats")
+
+    def __init__(self, kb, batch_window=0.002, max_batch=1024):
+        self.kb = kb
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = []
+        self._flush_handle = None
+        self._server = None
+        self._connections = {}  # задача обробника з'єднання -> його writer
+        self.counts = dict.fromkeys(self.OPERATIONS + ("error",), 0)
+        self.latencies = {op: deque(maxlen=LATENCY_SAMPLES) for op in self.counts}
+        self.batches = 0
+        self.batched = 0
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        """Починає приймати з'єднання (path - Unix-сокет замість TCP); повертає адресу"""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Зупиняє сервер: закриває відкриті з'єднання і скасовує їхні обробники,
+        інакше вони чекали б у readline(), а wait_closed() - на клієнтів.
+        """
+        self._server.close()
+        handlers = list(self._connections)
+        for handler, writer in self._connections.items():
+            writer.close()
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._flush()
+        self._executor.shutdown(wait=True)
+
+    async def _handle(self, reader, writer):
+        handler = asyncio.current_task()
+        self._connections[handler] = writer
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+        finally:
+            self._connections.pop(handler, None)
+            writer.close()
+
+    async def _respond(self, line, writer):
+        start = time.perf_counter()
+        request_id = op = None
+        try:
+            request = json.loads(line)
+            request_id, op = request.get("id"), request.get("op")
+            response = {"id": request_id, "result": await self._dispatch(op, request)}
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            op = "error"
+            response = {"id": request_id, "error": f"{type(error).__name__}: {error}"}
+        self.counts[op] += 1
+        self.latencies[op].append(time.perf_counter() - start)
+        writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    @staticmethod
+    def _entity(request, key):
+        """Сутність із запиту; не рядок відхиляється до того, як потрапить у пакет"""
+        entity = request[key]
+        if not isinstance(entity, str):
+            raise TypeError(f"'{key}' має бути рядком, а не {type(entity).__name__}")
+        return entity
+
+    async def _dispatch(self, op, request):
+        if op == "check_related":
+            related, reason = await self._check_related(self._entity(request, "a"), self._entity(request, "b"))
+            return {"related": related, "reason": reason}
+        if op == "stats":
+            return self.stats()
+        if op == "ancestors":
+            call = self.kb.get_all_parents, self._entity(request, "entity")
+        elif op == "wholes":
+            call = self.kb.get_all_wholes, self._entity(request, "entity")
+        elif op == "is_a":
+            call = self.kb.is_a, self._entity(request, "a"), self._entity(request, "b")
+        else:
+            raise ValueError(f"Невідомий запит '{op}'")
+        result = await asyncio.get_running_loop().run_in_executor(self._executor, *call)
+        return sorted(result) if isinstance(result, set) else result
+
+    def _check_related(self, entity_a, entity_b):
+        """Ставить пару в поточний пакет; пакет виконується після batch_window або при max_batch"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(((entity_a, entity_b), future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.batched += len(batch)
+        pairs = [pair for pair, _ in batch]
+        done = asyncio.get_running_loop().run_in_executor(self._executor, self._check_batch, pairs)
+        done.add_done_callback(lambda done: self._resolve(batch, done))
+
+    def _check_batch(self, pairs):
+        """
+        Виконує пакет через check_related_many. Якщо пакет падає, пари
+        перевіряються окремо, і помилку отримує лише та, що її спричинила.
+        """
+        try:
+            return self.kb.check_related_many(pairs)
+        except Exception:
+            results = []
+            for pair in pairs:
+                try:
+                    results.append(self.kb.check_related(*pair))
+                except Exception as error:
+                    results.append(error)
+            return results
+
+    @staticmethod
+    def _resolve(batch, done):
+        error = done.exception()
+        results = done.result() if error is None else None
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            elif isinstance(results[index], Exception):
+                future.set_exception(results[index])
+            else:
+                future.set_result(results[index])
+
+    def stats(self):
+        """Кількість запитів і затримки (мс) за видами запитів та розмір пакетів"""
+        stats = {}
+        for op, samples in self.latencies.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            stats[op] = {
+                "count": self.counts[op],
+                "mean_ms": 1000 * sum(ordered) / len(ordered),
+                "p50_ms": 1000 * ordered[len(ordered) // 2],
+                "p95_ms": 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "p99_ms": 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+                "max_ms": 1000 * ordered[-1],
+            }
+        stats["batches"] = self.batches
+        stats["avg_batch"] = self.batched / self.batches if self.batches else 0.0
+        return stats
+
+
+class QueryClient:
+    """Клієнт QueryServer: кілька запитів можуть одночасно чекати на відповідь"""
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._waiting = {}
+        self._ids = itertools.count(1)
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self._waiting.pop(response["id"], None)
+            if future is None or future.done():
+                continue
+            if "error" in response:
+                future.set_exception(QueryError(response["error"]))
+            else:
+                future.set_result(response["result"])
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Сервер закрив з'єднання"))
+
+    async def request(self, op, **params):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(json.dumps({"id": request_id, "op": op, **params}, ensure_ascii=False).encode("utf-8") + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def check_related(self, entity_a, entity_b):
+        result = await self.request("check_related", a=entity_a, b=entity_b)
+        return result["related"], result["reason"]
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._receiver.cancel()
+
+
+async def serve(kb, host="127.0.0.1", port=8765, path=None, batch_window=0.002):
+    """Запускає сервер до переривання і наприкінці друкує метрики затримок"""
+    server = QueryServer(kb, batch_window=batch_window)
+    address = await server.start(host, port, path)
+    print(f"Сервер бази знань слухає {address}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+        for op, value in server.stats().items():
+            print(f"{op}: {value}")
+
+
+# --- Бенчмарк ---
+
+def generate_ontology(facts, depth=8, branching=4, dag_density=0.1, part_of_ratio=0.3, eats_ratio=0.1, seed=0):
+    """
+    Потік триплетів синтетичної онтології приблизно з facts фактами.
+    Сутності e0, e1, ... розкладені по depth рівнях ієрархії (1, branching,
+    branching^2, ...; решта - на останньому рівні). Кожна сутність має
+    батька з попереднього рівня і з імовірністю dag_density ще одного з будь-якого
+    вищого рівня; з імовірностями part_of_ratio / eats_ratio - факт part_of
+    (ціле з меншим номером, тож без циклів) та eats (будь-яка жертва).
+    """
+    rng = random.Random(seed)
+    nodes = max(2, int(facts / (1 + dag_density + part_of_ratio + eats_ratio)))
+    bounds, size = [0], 1
+    while bounds[-1] + size < nodes and len(bounds) < depth:
+        bounds.append(bounds[-1] + size)
+        size *= branching
+    bounds.append(nodes)
+
+    for level in range(1, len(bounds) - 1):
+        for node in range(bounds[level], bounds[level + 1]):
+            name = f"e{node}"
+            yield name, "is_a", f"e{rng.randrange(bounds[level - 1], bounds[level])}"
+            if rng.random() < dag_density:
+                yield name, "is_a", f"e{rng.randrange(bounds[level])}"
+            if rng.random() < part_of_ratio:
+                yield name, "part_of", f"e{rng.randrange(node)}"
+            if rng.random() < eats_ratio:
+                yield name, "eats", f"e{rng.randrange(nodes)}"
+
+
+def _best_time(function, repeats=BENCHMARK_REPEATS, setup=None):
+    """
+    Найменший із repeats вимірів часу function() у секундах (мінімум найменше
+    залежить від сторонніх затримок). Як і timeit, на час виміру вимикає
+    збирач сміття. setup() викликається перед кожним виміром і не
+    враховується. Повертає (час, результат останнього виклику).
+    """
+    best = result = None
+    enabled = gc.isenabled()
+    try:
+        for _ in range(max(1, repeats)):
+            if setup is not None:
+                setup()
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+            if enabled:
+                gc.enable()
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if enabled:
+            gc.enable()
+    return best, result
+
+
+def _time_per_call(function, arguments, repeats=BENCHMARK_REPEATS, setup=None):
+    """Час одного виклику function(*args) у мікросекундах: середнє по arguments, найкраще з repeats"""
+    def calls():
+        for args in arguments:
+            function(*args)
+    return 1e6 * _best_time(calls, repeats, setup)[0] / max(1, len(arguments))
+
+
+def benchmark_size(facts, queries=1000, seed=0, memory=True, repeats=BENCHMARK_REPEATS, **shape):
+    """
+    Один рядок бенчмарку для онтології з facts фактами (shape - параметри
+    generate_ontology): завантаження з TSV, пам'ять, обчислення замикань,
+    check_related для кожної стратегії (пошук, пакет, кеш, індекс,
+    заморожена форма) і запис / відкриття знімка. Часи запитів - у мкс,
+    кожен час - найкращий з repeats вимірів.
+    """
+    rng = random.Random(seed)
+    row = {}
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "ontology.tsv")
+        with open(source, "w", encoding="utf-8") as f:
+            for subject, relation, obj in generate_ontology(facts, seed=seed, **shape):
+                f.write(f"{subject}\t{relation}\t{obj}\n")
+
+        def load():
+            kb = KnowledgeBase()
+            return kb, kb.load_triples(source)
+
+        load_s, (kb, row["facts"]) = _best_time(load, repeats)
+        row["load_s"] = load_s
+        # tracemalloc сповільнює завантаження, тож пам'ять міряється окремим проходом
+        if memory:
+            tracemalloc.start()
+            _kb, _ = load()
+            row["memory_mb"] = tracemalloc.get_traced_memory()[0] / 1e6
+            tracemalloc.stop()
+            del _kb
+
+        entities = list(kb.is_a_relations)
+        sample = [(rng.choice(entities),) for _ in range(queries)]
+        pairs = [(rng.choice(entities), rng.choice(entities)) for _ in range(queries)]
+
+        row["closure_us"] = _time_per_call(lambda entity: (kb.get_all_parents(entity), kb.get_all_wholes(entity)),
+                                           sample, repeats)
+        row["check_related_search_us"] = _time_per_call(kb.check_related, pairs, repeats)
+        row["check_related_batch_us"] = _time_per_call(kb.check_related_many, [(pairs,)], repeats) / len(pairs)
+
+        # Кожен вимір кешу починається з порожнього кешу, щоб частка влучань не росла з повторами
+        row["check_related_cache_us"] = _time_per_call(kb.check_related, pairs, repeats,
+                                                       setup=lambda: kb.enable_closure_cache(queries))
+        row["cache_hit_rate"] = kb.cache_stats()["ancestors"]["hit_rate"]
+
+        row["index_build_s"] = _best_time(kb.enable_closure_index, repeats)[0]
+        row["check_related_index_us"] = _time_per_call(kb.check_related, pairs, repeats)
+
+        row["freeze_s"], frozen = _best_time(kb.freeze, repeats)
+        row["check_related_frozen_us"] = _time_per_call(frozen.check_related, pairs, repeats)
+
+        snapshot = os.path.join(directory, "ontology.kbsnap")
+        row["snapshot_save_s"] = _best_time(lambda: frozen.save(snapshot), repeats)[0]
+        row["snapshot_open_s"] = _best_time(lambda: FrozenKnowledgeBase.load(snapshot), repeats)[0]
+        row["snapshot_mb"] = os.path.getsize(snapshot) / 1e6
+    return row
+
+
+def run_benchmark(sizes=(10 ** 3, 10 ** 4, 10 ** 5), queries=1000, seed=0, memory=True,
+                  repeats=BENCHMARK_REPEATS, **shape):
+    """Бенчмарк для кожного розміру з sizes; повертає {розмір: рядок benchmark_size}"""
+    return {str(size): benchmark_size(size, queries, seed, memory, repeats, **shape) for size in sizes}
+
+
+def save_baseline(results, filename, queries, **shape):
+    with open(filename, "w") as f:
+        json.dump({"shape": shape, "queries": queries, "results": results}, f, indent=2)
+
+
+def compare_baseline(results, filename, queries, tolerance=BENCHMARK_TOLERANCE, floors=BENCHMARK_FLOORS, **shape):
+    """
+    Порівнює results із базовою лінією з filename. Повертає список регресій
+    (розмір, метрика, було, стало) для часу (_s, _us) і пам'яті (_mb),
+    що зросли більш ніж на tolerance і водночас більш ніж на поріг floors
+    для суфікса метрики. Розміри й метрики, які є лише в одному з двох
+    запусків, теж потрапляють у список: None замість відсутнього значення
+    (для відсутнього розміру - один запис з метрикою None).
+    Якщо базову лінію знято з іншими queries або shape, піднімає
+    ValueError - такі числа не порівнюються.
+    """
+    with open(filename) as f:
+        baseline = json.load(f)
+    expected = {"shape": shape, "queries": queries}
+    stored = {"shape": baseline.get("shape"), "queries": baseline.get("queries")}
+    if stored != expected:
+        raise ValueError(f"Базову лінію {filename} знято з іншими параметрами: {stored}, а не {expected}")
+    regressions = []
+    for size in dict.fromkeys(list(baseline["results"]) + list(results)):
+        old_row, row = baseline["results"].get(size), results.get(size)
+        if old_row is None or row is None:
+            regressions.append((size, None, old_row, row))
+            continue
+        for metric in dict.fromkeys(list(old_row) + list(row)):
+            suffix = next((suffix for suffix in floors if metric.endswith(suffix)), None)
+            if suffix is None:
+                continue
+            old, value = old_row.get(metric), row.get(metric)
+            if old is None or value is None:
+                regressions.append((size, metric, old, value))
+            elif value > old * (1 + tolerance) and value - old > floors[suffix]:
+                regressions.append((size, metric, old, value))
+    return regressions
+
+
+def print_benchmark(results):
+    """Виводить результати run_benchmark таблицею: метрики в рядках, розміри в колонках"""
+    sizes = list(results)
+    metrics = list(dict.fromkeys(metric for row in results.values() for metric in row))
+    print(f"{'Метрика':<26}" + "".join(f"{size:>14}" for size in sizes))
+    for metric in metrics:
+        values = (results[size].get(metric) for size in sizes)
+        print(f"{metric:<26}" + "".join(f"{'-':>14}" if value is None else
+                                        f"{value:>14}" if isinstance(value, int) else f"{value:>14.3f}"
+                                        for value in values))
+
+
+# --- Робочі процеси для check_related_many ---
+
+_worker_kb = None
+
+
+def _init_worker(kb):
+    """
+    Зберігає базу знань у робочому процесі один раз, а не з кожним шматком.
+    Шлях до знімка відкривається тут через mmap, тож масиви не копіюються.
+    """
+    global _worker_kb
+    if isinstance(kb, str):
+        kb = FrozenKnowledgeBase.load(kb)._core
+    _worker_kb = kb
+
+
+def _relate_shard(pairs):
+    return _worker_kb._relate_pairs(pairs)
 
 
 # =========================================
 # ТЕСТУВАННЯ ЗАПИТІВ
 # =========================================
 
-def test_query(a, b):
-    result, reason = kb.check_related(a, b)
+def test_queries(kb, pairs):
+    """Виконує всі запити до kb одним пакетом через check_related_many"""
+    for (a, b), (result, reason) in zip(pairs, kb.check_related_many(pairs)):
+        print_result(a, b, result, reason)
+
+
+def print_result(a, b, result, reason):
     status = "✅ ТАК" if result else "❌ НІ"
     print(f"Запит: пов'язані '{a}' і '{b}'? -> {status} ({reason})")
 
 
-print("\n--- ПОЧАТОК ТЕСТУВАННЯ ---\n")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="База знань: is_a, part_of, eats")
+    parser.add_argument("--ontology", default=ONTOLOGY_FILE, help="файл триплетів (TSV, CSV або N-Triples)")
+    parser.add_argument("--serve", action="store_true", help="запустити сервер запитів замість тестів")
+    parser.add_argument("--host", default="127.0.0.1", help="адреса сервера")
+    parser.add_argument("--port", type=int, default=8765, help="порт сервера")
+    parser.add_argument("--socket", metavar="PATH", help="Unix-сокет замість TCP")
+    parser.add_argument("--batch-window", type=float, default=2.0, metavar="MS",
+                        help="скільки мілісекунд збирати запити check_related в один пакет")
+    parser.add_argument("--benchmark", type=int, nargs="+", metavar="FACTS",
+                        help="бенчмарк на синтетичних онтологіях із заданою кількістю фактів")
+    parser.add_argument("--queries", type=int, default=1000, help="кількість запитів бенчмарку на розмір")
+    parser.add_argument("--depth", type=int, default=8, help="глибина синтетичної ієрархії")
+    parser.add_argument("--branching", type=int, default=4, help="розгалуження синтетичної ієрархії")
+    parser.add_argument("--dag-density", type=float, default=0.1, help="частка сутностей з другим батьком")
+    parser.add_argument("--part-of-ratio", type=float, default=0.3, help="фактів part_of на сутність")
+    parser.add_argument("--eats-ratio", type=float, default=0.1, help="фактів eats на сутність")
+    parser.add_argument("--repeats", type=int, default=BENCHMARK_REPEATS,
+                        help="скільки разів повторювати кожен вимір бенчмарку (береться найкращий)")
+    parser.add_argument("--no-memory", action="store_true", help="не вимірювати пам'ять (tracemalloc сповільнює завантаження)")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="порівняти з базовою лінією FILE (якщо файлу ще немає - зберегти її туди)")
+    args = parser.parse_args()
 
-# 1. Головний тест із завдання
-test_query("dog", "fur")
-# Очікується: ТАК
+    if args.benchmark:
+        shape = {"depth": args.depth, "branching": args.branching, "dag_density": args.dag_density,
+                 "part_of_ratio": args.part_of_ratio, "eats_ratio": args.eats_ratio}
+        results = run_benchmark(args.benchmark, args.queries, memory=not args.no_memory, repeats=args.repeats, **shape)
+        print_benchmark(results)
+        if args.baseline and os.path.exists(args.baseline):
+            try:
+                regressions = compare_baseline(results, args.baseline, args.queries, **shape)
+            except ValueError as error:
+                parser.error(str(error))
+            for size, metric, old, new in regressions:
+                where = f"{size} фактів" + (f", {metric}" if metric is not None else "")
+                if old is None:
+                    print(f"Немає в базовій лінії: {where}")
+                elif new is None:
+                    print(f"Немає в цьому запуску: {where}")
+                else:
+                    print(f"Регресія: {size} фактів, {metric}: {old:.3f} -> {new:.3f}")
+            sys.exit(1 if regressions else 0)
+        if args.baseline:
+            save_baseline(results, args.baseline, args.queries, **shape)
+            print(f"Базову лінію збережено у {args.baseline}")
+        sys.exit()
 
-# 2. Тест ієрархії (глибокий)
-test_query("rex", "organism")
-# Очікується: ТАК
+    # Онтологія зберігається у файлі триплетів і відкривається з готового знімка
+    kb = load_ontology(args.ontology)
 
-# 3. Тест частини (простий)
-test_query("tail", "cat")
-# Очікується: ТАК
+    if args.serve:
+        try:
+            asyncio.run(serve(kb, args.host, args.port, args.socket, args.batch_window / 1000))
+        except KeyboardInterrupt:
+            pass
+        sys.exit()
 
-# 4. Тест харчування
-test_query("barsik", "bird")
-# Очікується: ТАК
+    print("\n--- ПОЧАТОК ТЕСТУВАННЯ ---\n")
 
-# 5. Негативний тест
-test_query("dog", "leaf")
-# Очікується: НІ
+    test_queries(kb, [
+        # 1. Головний тест із завдання (очікується: ТАК)
+        ("dog", "fur"),
+        # 2. Тест ієрархії, глибокий (очікується: ТАК)
+        ("rex", "organism"),
+        # 3. Тест частини, простий (очікується: ТАК)
+        ("tail", "cat"),
+        # 4. Тест харчування (очікується: ТАК)
+        ("barsik", "bird"),
+        # 5. Негативний тест (очікується: НІ)
+        ("dog", "leaf"),
+    ])
 
-print("\n--- КІНЕЦЬ ТЕСТУВАННЯ ---")
+    print("\n--- КІНЕЦЬ ТЕСТУВАННЯ ---")
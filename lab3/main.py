@@ -1,58 +1,660 @@
-import random, string
+import argparse
+import functools
+import heapq
+import multiprocessing
+import random
+import string
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy потрібен лише для векторизованої популяції (VectorizedPopulation)
+    np = None
 
 # --- НАЛАШТУВАННЯ ---
 TARGET = "HELLO GENETIC ALGORITHM"  # Цільова фраза
 POP_SIZE = 200  # Розмір популяції
 ALPHABET = string.ascii_uppercase + " "  # Дозволені символи (літери + пробіл)
+ELITES = 20  # Скільки найкращих переходять у нове покоління без змін
+MUTATION_RATE = 0.1  # Шанс замінити один випадковий символ у дитини
+GENERATIONS = 1000  # Максимальна кількість поколінь
+FITNESS_CACHE_SIZE = 10000  # Скільки оцінок геном -> fitness пам'ятає FitnessEvaluator
+
+# Острівна модель: звідки кожен острів отримує мігрантів
+TOPOLOGIES = {
+    "ring": lambda island, islands: [(island - 1) % islands],
+    "full": lambda island, islands: [other for other in range(islands) if other != island],
+}
 
 
 # Функція оцінки (Fitness): кількість співпадінь символів з ціллю
-def get_fitness(individual):
+def get_fitness(individual, target=TARGET):
     score = 0
-    for i in range(len(TARGET)):
-        if individual[i] == TARGET[i]:
+    for i in range(len(target)):
+        if individual[i] == target[i]:
             score += 1
     return score
 
 
+# Fitness окремо для лівої та правої половини (до і після точки розрізу mid):
+# дитина бере ліву половину одного батька і праву іншого, тож її fitness -
+# сума половин батьків, а мутація змінює лише одну з них
+def get_half_fitness(individual, mid, target=TARGET):
+    left = right = 0
+    for i in range(len(target)):
+        if individual[i] == target[i]:
+            if i < mid:
+                left += 1
+            else:
+                right += 1
+    return left, right
+
+
+def select_top(fitness, count, max_score):
+    """
+    Індекси count найкращих особин у тому ж порядку, що дало б стабільне
+    сортування за спаданням fitness, але без сортування всієї популяції:
+    fitness - ціле від 0 до max_score, тож особини розкладаються по
+    кошиках за один прохід, і беруться кошики від найкращого.
+    """
+    buckets = [[] for _ in range(max_score + 1)]
+    for index, score in enumerate(fitness):
+        buckets[score].append(index)
+    top = []
+    for bucket in reversed(buckets):
+        top.extend(bucket[:count - len(top)])
+        if len(top) == count:
+            break
+    return top
+
+
 # --- ГЕНЕТИЧНИЙ АЛГОРИТМ ---
 
-# 1. Створюємо початкову популяцію (випадкові рядки)
-population = []
-for _ in range(POP_SIZE):
-    ind = ''.join(random.choice(ALPHABET) for _ in range(len(TARGET)))
-    population.append(ind)
+class Population:
+    """
+    Популяція рядків разом із fitness по половинах (див. get_half_fitness).
+    rank() оцінює покоління, next_generation() будує наступне: елітизм,
+    батьки з кращої половини, розріз посередині, мутація одного символу.
+    rng - генератор випадкових чисел (за замовчуванням модуль random).
+    """
+
+    def __init__(self, target=TARGET, pop_size=POP_SIZE, alphabet=ALPHABET, rng=random):
+        self.target = target
+        self.alphabet = alphabet
+        self.rng = rng
+        self.mid = len(target) // 2  # Точка розрізу для кросовера
+
+        # Початкова популяція (випадкові рядки) оцінюється один раз
+        self.individuals = [''.join(rng.choice(alphabet) for _ in range(len(target))) for _ in range(pop_size)]
+        self.halves = [get_half_fitness(ind, self.mid, target) for ind in self.individuals]
+        self.top = None
+
+    def rank(self):
+        """Знаходить кращі 50% (перші ELITES з них - еліта); повертає (найкращий, його fitness)"""
+        fitness = [left + right for left, right in self.halves]
+        self.top = select_top(fitness, len(self.individuals) // 2, len(self.target))
+        best = self.top[0]
+        return self.individuals[best], fitness[best]
+
+    def next_generation(self, elites=ELITES, mutation_rate=MUTATION_RATE):
+        if self.top is None:
+            self.rank()
+        population, halves, top, mid = self.individuals, self.halves, self.top, self.mid
+
+        # Елітизм: ELITES найкращих автоматично переходять у нове покоління разом зі своїм fitness
+        next_generation = [population[i] for i in top[:elites]]
+        next_halves = [halves[i] for i in top[:elites]]
+
+        # Генеруємо решту нащадків
+        while len(next_generation) < len(population):
+            # Селекція: беремо двох випадкових батьків з топ-50% найкращих
+            parent1 = self.rng.choice(top)
+            parent2 = self.rng.choice(top)
+
+            # Кросовер: точка розрізу посередині, fitness - з половин батьків
+            child = population[parent1][:mid] + population[parent2][mid:]
+            left, right = halves[parent1][0], halves[parent2][1]
+
+            # Мутація: з шансом mutation_rate замінюємо ОДИН випадковий символ у дитини
+            if self.rng.random() < mutation_rate:
+                char_idx = self.rng.randint(0, len(self.target) - 1)
+                # Замінюємо символ на випадковий з алфавіту і враховуємо зміну співпадіння
+                new_char = self.rng.choice(self.alphabet)
+                delta = (new_char == self.target[char_idx]) - (child[char_idx] == self.target[char_idx])
+                if char_idx < mid:
+                    left += delta
+                else:
+                    right += delta
+                child = child[:char_idx] + new_char + child[char_idx + 1:]
+
+            next_generation.append(child)
+            next_halves.append((left, right))
+
+        self.individuals, self.halves, self.top = next_generation, next_halves, None
+
+    def migrants(self, count):
+        """count найкращих особин для інших островів"""
+        if self.top is None:
+            self.rank()
+        return [self.individuals[i] for i in self.top[:count]]
+
+    def receive(self, individuals):
+        """Мігранти з інших островів заміщають найгірших"""
+        fitness = [left + right for left, right in self.halves]
+        worst = heapq.nsmallest(len(individuals), range(len(fitness)), key=fitness.__getitem__)
+        for index, individual in zip(worst, individuals):
+            self.individuals[index] = individual
+            self.halves[index] = get_half_fitness(individual, self.mid, self.target)
+        self.top = None
+
+
+def run(population, generations=GENERATIONS):
+    """Головний цикл: друкує найкращого в кожному поколінні, доки не знайдено ціль"""
+    for generation in range(generations):
+        best, score = population.rank()
+
+        print(f"Покоління {generation:3}: {best} (Співпадінь: {score}/{len(population.target)})")
+
+        if score == len(population.target):
+            print("\nЦІЛЬ ДОСЯГНУТО!")
+            break
+
+        population.next_generation()
+
+
+def evolve(generations=GENERATIONS):
+    run(Population(), generations)
+
+
+# --- ВЕКТОРИЗОВАНА ПОПУЛЯЦІЯ ---
+
+class VectorizedPopulation:
+    """
+    Уся популяція - один масив uint8 розміру (pop_size, len(target)) з кодами
+    символів. Селекція, кросовер і мутація - операціями над масивами, без
+    рядків. Правила й методи ті самі, що в Population. Як і там, fitness
+    зберігається по половинах і для нащадків виводиться з половин батьків
+    та зміни від мутації; порівняння з ціллю потрібне лише для першого
+    покоління та мігрантів. Нове покоління пишеться в запасні масиви, тож
+    пам'ять під популяцію не виділяється щопокоління.
+    """
+
+    def __init__(self, target=TARGET, pop_size=POP_SIZE, alphabet=ALPHABET, seed=None):
+        if np is None:
+            raise RuntimeError("Для VectorizedPopulation потрібен NumPy")
+        self.target = target
+        self.encoded_target = self.encode(target)
+        self.alphabet = self.encode(alphabet)
+        self.rng = np.random.default_rng(seed)
+        self.genes = self.random_genes((pop_size, len(target)))
+        self.mid = len(target) // 2
+        self.left, self.right = self.half_fitness(self.genes)
+        self._spare = np.empty_like(self.genes), np.empty_like(self.left), np.empty_like(self.right)
+        self.elite = self.pool = None
+
+    @staticmethod
+    def encode(text):
+        return np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+
+    def random_genes(self, shape):
+        return self.alphabet[self.rng.integers(len(self.alphabet), size=shape)]
+
+    def half_fitness(self, genes):
+        """Співпадіння з ціллю в лівій і правій половинах для кожного рядка genes"""
+        matches = genes == self.encoded_target
+        return np.count_nonzero(matches[:, :self.mid], axis=1), np.count_nonzero(matches[:, self.mid:], axis=1)
+
+    def fitness(self):
+        """Кількість співпадінь з ціллю для кожної особини"""
+        return self.left + self.right
+
+    def decode(self, index):
+        return self.genes[index].tobytes().decode("ascii")
+
+    def rank(self, elites=ELITES):
+        """
+        Часткова селекція без повного сортування: індекси кращої половини
+        (у довільному порядку) та ELITES найкращих з неї, від кращого.
+        Повертає (найкращий, його fitness).
+        """
+        fitness = self.fitness()
+        half = len(fitness) // 2
+        pool = np.argpartition(-fitness, half - 1)[:half]
+        elites = min(elites, len(pool))
+        elite = pool[np.argpartition(-fitness[pool], elites - 1)[:elites]]
+        self.elite, self.pool = elite[np.argsort(-fitness[elite], kind="stable")], pool
+        best = self.elite[0]
+        return self.decode(best), int(fitness[best])
+
+    def next_generation(self, mutation_rate=MUTATION_RATE):
+        if self.elite is None:
+            self.rank()
+        elite, pool = self.elite, self.pool
+        pop_size, length = self.genes.shape
+        elites, mid = len(elite), self.mid
+        children = pop_size - elites
+        first = pool[self.rng.integers(len(pool), size=children)]
+        second = pool[self.rng.integers(len(pool), size=children)]
+
+        genes, left, right = self._spare
+        genes[:elites] = self.genes[elite]
+        left[:elites] = self.left[elite]
+        right[:elites] = self.right[elite]
+        genes[elites:, :mid] = self.genes[first, :mid]
+        genes[elites:, mid:] = self.genes[second, mid:]
+        left[elites:] = self.left[first]
+        right[elites:] = self.right[second]
+
+        # Мутація: різниця співпадіння в зміненій позиції додається до її половини
+        mutants = elites + np.flatnonzero(self.rng.random(children) < mutation_rate)
+        positions = self.rng.integers(length, size=len(mutants))
+        chars = self.random_genes(len(mutants))
+        expected = self.encoded_target[positions]
+        delta = (chars == expected).astype(left.dtype) - (genes[mutants, positions] == expected)
+        genes[mutants, positions] = chars
+        in_left = positions < mid
+        left[mutants[in_left]] += delta[in_left]
+        right[mutants[~in_left]] += delta[~in_left]
+
+        self._spare = self.genes, self.left, self.right
+        self.genes, self.left, self.right = genes, left, right
+        self.elite = self.pool = None
+
+    def migrants(self, count):
+        """count найкращих особин для інших островів"""
+        if self.elite is None or count > len(self.elite):
+            fitness = self.fitness()
+            count = min(count, len(fitness))
+            best = np.argpartition(-fitness, count - 1)[:count]
+            return [self.decode(index) for index in best[np.argsort(-fitness[best], kind="stable")]]
+        return [self.decode(index) for index in self.elite[:count]]
+
+    def receive(self, individuals):
+        """Мігранти з інших островів заміщають найгірших"""
+        individuals = individuals[:len(self.genes)]
+        if not individuals:
+            return
+        worst = np.argpartition(self.fitness(), len(individuals) - 1)[:len(individuals)]
+        self.genes[worst] = np.stack([self.encode(individual) for individual in individuals])
+        self.left[worst], self.right[worst] = self.half_fitness(self.genes[worst])
+        self.elite = self.pool = None
+
+
+def evolve_vectorized(target=TARGET, pop_size=POP_SIZE, generations=GENERATIONS, seed=None):
+    run(VectorizedPopulation(target, pop_size, seed=seed), generations)
+
+
+# --- ОСТРІВНА МОДЕЛЬ ---
+
+def _island(connection, target, pop_size, seed, vectorized, interval, migrants):
+    """
+    Робочий процес острова: проганяє interval поколінь, надсилає номер
+    покоління, найкращого та migrants кращих особин і чекає на мігрантів (None - завершення).
+    """
+    if vectorized:
+        population = VectorizedPopulation(target, pop_size, seed=seed)
+    else:
+        population = Population(target, pop_size, rng=random.Random(seed))
+    generation = 0
+    while True:
+        for _ in range(interval):
+            best, score = population.rank()
+            if score == len(target):
+                break
+            population.next_generation()
+            generation += 1
+        best, score = population.rank()
+        connection.send((generation, best, score, population.migrants(migrants)))
+        incoming = connection.recv()
+        if incoming is None:
+            break
+        population.receive(incoming)
+    connection.close()
+
+
+def evolve_islands(islands=None, interval=10, migrants=2, topology="ring", target=TARGET, pop_size=POP_SIZE,
+                   generations=GENERATIONS, seed=None, vectorized=False):
+    """
+    Острівна модель: islands незалежних популяцій (за замовчуванням - по
+    одній на ядро) еволюціонують в окремих процесах. Кожні interval
+    поколінь острови через канали надсилають migrants кращих особин, і
+    кожен отримує мігрантів від сусідів за топологією (TOPOLOGIES):
+    "ring" - від попереднього острова, "full" - від усіх інших. Мігранти
+    заміщають найгірших особин. Друкує найкращого серед островів після
+    кожної міграції і зупиняє всі острови, щойно ціль знайдено.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Невідома топологія: '{topology}'")
+    islands = islands or multiprocessing.cpu_count()
+    connections, processes = [], []
+    for island in range(islands):
+        parent, child = multiprocessing.Pipe()
+        island_seed = None if seed is None else seed + island
+        process = multiprocessing.Process(target=_island, daemon=True,
+                                          args=(child, target, pop_size, island_seed, vectorized, interval, migrants))
+        process.start()
+        child.close()
+        connections.append(parent)
+        processes.append(process)
+
+    try:
+        for _ in range(-(-generations // interval)):
+            reports = [connection.recv() for connection in connections]
+            island = max(range(islands), key=lambda index: reports[index][2])
+            generation, best, score, _ = reports[island]
+
+            print(f"Покоління {generation:4}: {best} (Співпадінь: {score}/{len(target)}, острів {island})")
+
+            if score == len(target):
+                print("\nЦІЛЬ ДОСЯГНУТО!")
+                break
+
+            for index, connection in enumerate(connections):
+                sources = TOPOLOGIES[topology](index, islands)
+                connection.send([individual for source in sources for individual in reports[source][3]])
+    finally:
+        for connection in connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        for process in processes:
+            process.join()
+
+
+# --- НАЛАШТОВУВАНИЙ ГА ---
+
+# Оператори для GeneticAlgorithm. Фабрики повертають функції з однаковими
+# сигнатурами, тож їх можна комбінувати й замінювати власними:
+#   селекція:  select(individuals, scores, count, rng) -> count батьків
+#   кросовер:  crossover(parent1, parent2, rng) -> дитина
+#   мутація:   mutate(individual, alphabet, rng) -> особина
+
+def matches(target):
+    """Fitness: get_fitness для заданого target; придатна для пулу процесів"""
+    return functools.partial(get_fitness, target=target)
+
+
+def truncation(fraction=0.5):
+    """Батьки випадково з кращої частки fraction популяції (як в evolve)"""
+    def select(individuals, scores, count, rng):
+        size = max(1, int(len(individuals) * fraction))
+        pool = [individuals[i] for i in heapq.nlargest(size, range(len(scores)), key=scores.__getitem__)]
+        return [rng.choice(pool) for _ in range(count)]
+    return select
+
+
+def tournament(size=3):
+    """Кожен батько - найкращий із size випадкових особин"""
+    def select(individuals, scores, count, rng):
+        indices = range(len(individuals))
+        entrants = min(size, len(individuals))
+        return [individuals[max(rng.sample(indices, entrants), key=scores.__getitem__)] for _ in range(count)]
+    return select
+
+
+def roulette():
+    """
+    Шанс стати батьком пропорційний fitness (за нульової суми - рівний).
+    Якщо є від'ємні оцінки, усі зсуваються на -min(scores), щоб ваги були невід'ємні.
+    """
+    def select(individuals, scores, count, rng):
+        lowest = min(scores)
+        if lowest < 0:
+            scores = [score - lowest for score in scores]
+        weights = scores if any(score > 0 for score in scores) else None
+        return rng.choices(individuals, weights=weights, k=count)
+    return select
+
+
+SELECTIONS = {"truncation": truncation, "tournament": tournament, "roulette": roulette}
+
+
+def midpoint_crossover(parent1, parent2, rng):
+    """Розріз посередині (як в evolve)"""
+    mid = len(parent1) // 2
+    return parent1[:mid] + parent2[mid:]
+
+
+def one_point_crossover(parent1, parent2, rng):
+    point = rng.randint(1, len(parent1) - 1)
+    return parent1[:point] + parent2[point:]
+
+
+def uniform_crossover(parent1, parent2, rng):
+    return ''.join(a if rng.random() < 0.5 else b for a, b in zip(parent1, parent2))
+
+
+CROSSOVERS = {"midpoint": midpoint_crossover, "one_point": one_point_crossover, "uniform": uniform_crossover}
+
+
+def point_mutation(rate=MUTATION_RATE):
+    """З шансом rate замінює ОДИН випадковий символ (як в evolve)"""
+    def mutate(individual, alphabet, rng):
+        if rng.random() < rate:
+            index = rng.randint(0, len(individual) - 1)
+            individual = individual[:index] + rng.choice(alphabet) + individual[index + 1:]
+        return individual
+    return mutate
+
+
+def gene_mutation(rate=0.01):
+    """Кожен символ незалежно з шансом rate замінюється випадковим"""
+    def mutate(individual, alphabet, rng):
+        return ''.join(rng.choice(alphabet) if rng.random() < rate else char for char in individual)
+    return mutate
+
+
+class FitnessEvaluator:
+    """
+    Шар оцінки навколо fitness для дорогих цільових функцій:
+    - кеш геном -> fitness на cache_size записів, що витісняє найдавніше
+      використаний запис (LRU), тож еліта й інші повтори між поколіннями
+      не оцінюються вдруге;
+    - у межах одного виклику кожен різний геном оцінюється один раз;
+    - промахи кешу оцінюються пакетом у пулі executor: "thread", "process"
+      (fitness тоді має серіалізуватися pickle, як matches), готовий
+      concurrent.futures.Executor або None - у поточному потоці.
+    Передбачає, що fitness детермінована. Лічильники - у stats().
+    """
+
+    def __init__(self, fitness, cache_size=FITNESS_CACHE_SIZE, executor=None, workers=None, chunk_size=64):
+        self.fitness = fitness
+        self.cache_size = cache_size
+        self.chunk_size = chunk_size
+        self._cache = OrderedDict()
+        self._owns_executor = isinstance(executor, str)
+        if executor == "thread":
+            executor = ThreadPoolExecutor(workers)
+        elif executor == "process":
+            executor = ProcessPoolExecutor(workers)
+        elif executor is not None and not isinstance(executor, Executor):
+            raise ValueError(f"Невідомий пул для оцінки: '{executor}'")
+        self.executor = executor
+        self.requests = self.cache_hits = self.duplicates = self.evaluations = 0
+        self.fitness_time = 0.0
+
+    def __call__(self, individuals):
+        """Fitness для кожної особини individuals, у тому ж порядку"""
+        scores = {}
+        missing = []
+        for individual in individuals:
+            self.requests += 1
+            if individual in scores:
+                self.duplicates += 1
+            elif individual in self._cache:
+                self.cache_hits += 1
+                self._cache.move_to_end(individual)
+                scores[individual] = self._cache[individual]
+            else:
+                scores[individual] = None
+                missing.append(individual)
+
+        if missing:
+            start = time.perf_counter()
+            if self.executor is None:
+                results = [self.fitness(individual) for individual in missing]
+            else:
+                results = list(self.executor.map(self.fitness, missing, chunksize=self.chunk_size))
+            self.fitness_time += time.perf_counter() - start
+            self.evaluations += len(missing)
+            for individual, score in zip(missing, results):
+                scores[individual] = score
+                self._remember(individual, score)
+        return [scores[individual] for individual in individuals]
+
+    def _remember(self, individual, score):
+        if self.cache_size <= 0:
+            return
+        self._cache[individual] = score
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "evaluations": self.evaluations,
+            "saved": self.requests - self.evaluations,
+            "cache_hits": self.cache_hits,
+            "duplicates": self.duplicates,
+            "cache_size": len(self._cache),
+            "fitness_time_s": self.fitness_time,
+        }
+
+    def close(self):
+        """Зупиняє власний пул (створений за назвою "thread" / "process")"""
+        if self._owns_executor:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GeneticAlgorithm:
+    """
+    Налаштовуваний генетичний алгоритм над рядками довжини length з алфавіту
+    alphabet. fitness(individual) повертає число (більше - краще);
+    selection, crossover і mutation - оператори вище або власні функції з
+    тими самими сигнатурами. Усі випадкові рішення бере з власного
+    random.Random(seed), тож прогони відтворювані й не впливають один на
+    одного та на модуль random.
+
+    run() зупиняється, коли fitness досягає target_fitness, коли найкращий
+    результат не покращується patience поколінь або коли callback(generation,
+    best, score) повертає True. Нічого не друкує.
+
+    Покоління оцінюються через evaluator (за замовчуванням FitnessEvaluator
+    з кешем), тож еліта та повтори не оцінюються знову.
+    """
+
+    def __init__(self, fitness, length, alphabet=ALPHABET, pop_size=POP_SIZE, elites=ELITES,
+                 selection=None, crossover=midpoint_crossover, mutation=None,
+                 target_fitness=None, patience=None, callback=None, seed=None, evaluator=None):
+        self.fitness = fitness
+        self.evaluator = evaluator or FitnessEvaluator(fitness)
+        self.length = length
+        self.alphabet = alphabet
+        self.pop_size = pop_size
+        self.elites = elites
+        self.selection = selection or truncation()
+        self.crossover = crossover
+        self.mutation = mutation or point_mutation()
+        self.target_fitness = target_fitness
+        self.patience = patience
+        self.callback = callback
+        self.rng = random.Random(seed)
+
+    def initial_population(self):
+        return [''.join(self.rng.choice(self.alphabet) for _ in range(self.length)) for _ in range(self.pop_size)]
 
-for generation in range(1000):
-    # Сортуємо популяцію від кращих до гірших
-    population.sort(key=get_fitness, reverse=True)
-    best = population[0]
+    def evaluate(self, population):
+        return self.evaluator(population)
 
-    print(f"Покоління {generation:3}: {best} (Співпадінь: {get_fitness(best)}/{len(TARGET)})")
+    def next_generation(self, population, scores):
+        """Еліта переходить без змін, решта - нащадки пар батьків від selection"""
+        elite = heapq.nlargest(self.elites, range(len(population)), key=scores.__getitem__)
+        next_generation = [population[i] for i in elite]
+        parents = self.selection(population, scores, 2 * (self.pop_size - len(next_generation)), self.rng)
+        for parent1, parent2 in zip(parents[::2], parents[1::2]):
+            child = self.crossover(parent1, parent2, self.rng)
+            next_generation.append(self.mutation(child, self.alphabet, self.rng))
+        return next_generation
 
-    if best == TARGET:
-        print("\nЦІЛЬ ДОСЯГНУТО!")
-        break
+    def run(self, generations=GENERATIONS):
+        """
+        Еволюціонує до generations поколінь або до зупинки. Повертає словник:
+        найкраща особина, її fitness, кількість поколінь і історія найкращого
+        fitness по поколіннях.
+        """
+        population = self.initial_population()
+        best, best_score, stale, history = None, None, 0, []
+        for generation in range(generations):
+            scores = self.evaluate(population)
+            leader = max(range(len(scores)), key=scores.__getitem__)
+            history.append(scores[leader])
+            if best_score is None or scores[leader] > best_score:
+                best, best_score, stale = population[leader], scores[leader], 0
+            else:
+                stale += 1
 
-    # Елітизм: 20 найкращих автоматично переходять у нове покоління
-    next_generation = population[:20]
+            if self.callback is not None and self.callback(generation, population[leader], scores[leader]):
+                break
+            if self.target_fitness is not None and best_score >= self.target_fitness:
+                break
+            if self.patience is not None and stale >= self.patience:
+                break
+            population = self.next_generation(population, scores)
+        return {"best": best, "fitness": best_score, "generations": len(history), "history": history}
 
-    # Генеруємо решту нащадків
-    while len(next_generation) < POP_SIZE:
-        # Селекція: беремо двох випадкових батьків з топ-50% найкращих
-        parent1 = random.choice(population[:POP_SIZE // 2])
-        parent2 = random.choice(population[:POP_SIZE // 2])
 
-        # Кросовер: точка розрізу посередині
-        mid = len(TARGET) // 2
-        child = parent1[:mid] + parent2[mid:]
+def print_progress(generation, best, score):
+    """Callback для GeneticAlgorithm, що друкує кожне покоління як run()"""
+    print(f"Покоління {generation:3}: {best} (Співпадінь: {score})")
 
-        # Мутація: з шансом 10% замінюємо ОДИН випадковий символ у дитини
-        if random.random() < 0.1:
-            char_idx = random.randint(0, len(TARGET) - 1)
-            # Замінюємо символ на випадковий з алфавіту
-            child = child[:char_idx] + random.choice(ALPHABET) + child[char_idx + 1:]
 
-        next_generation.append(child)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генетичний алгоритм: пошук цільової фрази")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="зберігати популяцію масивом NumPy (для популяцій 10^5-10^6)")
+    parser.add_argument("--pop-size", type=int, default=POP_SIZE, help="розмір популяції (на острів)")
+    parser.add_argument("--target", default=TARGET, help="цільова фраза")
+    parser.add_argument("--seed", type=int, help="seed генератора")
+    parser.add_argument("--islands", type=int, nargs="?", const=0, metavar="K",
+                        help="острівна модель з K популяціями в окремих процесах (без K - по одній на ядро)")
+    parser.add_argument("--migration-interval", type=int, default=10, metavar="M",
+                        help="обмін мігрантами кожні M поколінь")
+    parser.add_argument("--migrants", type=int, default=2, help="скільки кращих особин надсилає острів")
+    parser.add_argument("--topology", choices=sorted(TOPOLOGIES), default="ring", help="топологія міграції")
+    parser.add_argument("--selection", choices=sorted(SELECTIONS),
+                        help="запустити GeneticAlgorithm з цією селекцією замість швидкого циклу")
+    parser.add_argument("--crossover", choices=sorted(CROSSOVERS), default="midpoint", help="кросовер (з --selection)")
+    parser.add_argument("--patience", type=int, help="зупинитися без покращення за стільки поколінь (з --selection)")
+    parser.add_argument("--fitness-cache", type=int, default=FITNESS_CACHE_SIZE,
+                        help="розмір кешу оцінок (з --selection)")
+    parser.add_argument("--fitness-pool", choices=["thread", "process"], help="оцінювати fitness у пулі (з --selection)")
+    parser.add_argument("--fitness-workers", type=int, help="кількість потоків / процесів пулу оцінки")
+    args = parser.parse_args()
 
-    population = next_generation
+    if args.selection:
+        fitness = matches(args.target)
+        with FitnessEvaluator(fitness, args.fitness_cache, args.fitness_pool, args.fitness_workers) as evaluator:
+            result = GeneticAlgorithm(fitness, len(args.target), pop_size=args.pop_size,
+                                      selection=SELECTIONS[args.selection](), crossover=CROSSOVERS[args.crossover],
+                                      target_fitness=len(args.target), patience=args.patience,
+                                      callback=print_progress, seed=args.seed, evaluator=evaluator).run()
+        if result["fitness"] == len(args.target):
+            print("\nЦІЛЬ ДОСЯГНУТО!")
+        for key, value in evaluator.stats().items():
+            print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    elif args.islands is not None:
+        evolve_islands(args.islands or None, args.migration_interval, args.migrants, args.topology,
+                       args.target, args.pop_size, seed=args.seed, vectorized=args.vectorized)
+    elif args.vectorized:
+        evolve_vectorized(args.target, args.pop_size, seed=args.seed)
+    else:
+        run(Population(args.target, args.pop_size, rng=random.Random(args.seed)))